@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import os
+import re
+import time
+import argparse
+import multiprocessing
+
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.commit_message import tokenize_commit_message, parse_test_profiles
+
+# The profile pattern the handlers used before lib/commit_message.py, kept
+# here to compare against
+REGEX_PROFILE_PATTERN = re.compile(
+    r"^((?:\w+_)+\w+): (\d+) tests, (\d+) failures, (\d+) skipped, (\d+) seconds\n"
+    r"(?:.*?\n)*?  Failures:(.*?)(?=\n(?:\w+_)+\w+: |\nTotals: |\n\n|\Z)",
+    re.MULTILINE | re.DOTALL)
+
+
+def regex_parse(log):
+    """
+    Parse the profiles the way the backtracking regex did.
+    """
+    return {match.group(1): match.group(6).split()
+            for match in REGEX_PROFILE_PATTERN.finditer(log)}
+
+
+def state_machine_parse(log):
+    """
+    Parse the profiles with the tokenizer and the profile section parser.
+    """
+    return parse_test_profiles(tokenize_commit_message(log))
+
+
+def make_header():
+    """
+    Header lines every generated commit message starts with.
+    """
+    return ("workflow: fstests\ntree: linux\nref: v6.15\n\n"
+            "KERNEL:    6.15.0-rc2-g57265e6ac675\nCPUS:      8\n\n")
+
+
+def make_failures(count):
+    """
+    A failure list of count tests, six to a line.
+    """
+    tests = [f"generic/{i:05d}" for i in range(count)]
+    lines = [" ".join(tests[i:i + 6]) for i in range(0, len(tests), 6)]
+    return "  Failures: " + "\n    ".join(lines) + "\n"
+
+
+def make_typical(scale):
+    """
+    Profiles which all have a short failure list.
+    """
+    log = make_header()
+    for i in range(scale):
+        log += f"xfs_profile_{i}: 1000 tests, 30 failures, 100 skipped, 3600 seconds\n"
+        log += make_failures(30)
+    return log + f"Totals: {1000 * scale} tests, 0 skipped, 0 failures, 0 errors, 0s\n"
+
+
+def make_missing_failures(scale):
+    """
+    Profiles without any failure list, so the regex looks for one until
+    the end of the message for each of them.
+    """
+    log = make_header()
+    for i in range(scale):
+        log += f"xfs_profile_{i}: 1000 tests, 0 failures, 100 skipped, 3600 seconds\n"
+        log += "  Skipped: generic/001 generic/002\n"
+    return log
+
+
+def make_huge_failure_list(scale):
+    """
+    A single profile failing ten thousand tests times scale.
+    """
+    count = 10000 * scale
+    return (make_header() +
+            f"xfs_defaults: {count} tests, {count} failures, 0 skipped, 3600 seconds\n" +
+            make_failures(count) + "\n")
+
+
+def make_long_names(scale):
+    """
+    Lines made of long underscored words which almost look like profiles.
+    """
+    word = "_".join(["a"] * 24)
+    return make_header() + "".join(f"{word}: not a profile\n" for _ in range(scale * 100))
+
+
+INPUTS = {
+    'typical': make_typical,
+    'missing-failures': make_missing_failures,
+    'huge-failure-list': make_huge_failure_list,
+    'long-names': make_long_names,
+}
+
+
+def bench(parse, log, repeat):
+    """
+    Get the best time of parsing log repeat times, and the parse result.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(log)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_with_timeout(parse, log, repeat, timeout):
+    """
+    Run bench() in a child process which is killed after timeout seconds,
+    as the regex can backtrack for longer than anyone wants to wait.
+    Returns None on timeout.
+    """
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply_async(bench, (parse, log, repeat)).get(timeout)
+    except multiprocessing.TimeoutError:
+        return None
+    finally:
+        pool.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the fstests profile parser against the regex it replaced"
+    )
+    parser.add_argument("-s", "--scale", type=int, default=10,
+                        help="Size of the generated inputs (default: 10)")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Runs per input, the best one is reported (default: 3)")
+    parser.add_argument("-t", "--timeout", type=float, default=10,
+                        help="Seconds after which the regex is given up on (default: 10)")
+    parser.add_argument("--skip-regex", action="store_true",
+                        help="Only time the state machine parser")
+    args = parser.parse_args()
+
+    print(f"{'input':<20} {'size':>10} {'regex':>12} {'state machine':>14}")
+    for name, make_input in INPUTS.items():
+        for scale in (args.scale, args.scale * 4):
+            log = make_input(scale)
+
+            state_time, parsed = bench(state_machine_parse, log, args.repeat)
+
+            if args.skip_regex:
+                regex_column = "-"
+            else:
+                result = bench_with_timeout(regex_parse, log, args.repeat, args.timeout)
+                if result is None:
+                    regex_column = f">{args.timeout:g}s"
+                else:
+                    regex_time, expected = result
+                    regex_column = f"{regex_time * 1000:.2f}ms"
+                    # The regex drops profiles without a failure list and
+                    # lets them take the failures of the next profile
+                    if any(profile in parsed and parsed[profile]['failures'] != failures
+                           for profile, failures in expected.items()):
+                        print(f"Note: {name} parses differently from the regex")
+
+            print(f"{name:<20} {len(log):>10} {regex_column:>12} {state_time * 1000:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,94 @@
 #!/usr/bin/python3
 
 import sys
-import re
-import subprocess
+import os
 import argparse
+import contextlib
 from collections import defaultdict
 
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.git_reader import CommitReader
+from lib.commit_message import (get_profile_names, parse_profile_section,
+                                tokenize_commit_message)
+from lib.filesystems import determine_filesystem_type
+from lib.flakiness import get_failure_history, is_flaky, score_flakiness
+from lib.results_index import DEFAULT_TEST_TYPE, INDEX_FILE, open_results_index
+
+# Both commits are read through a single git cat-file process
+commit_reader = CommitReader()
+
 
 def get_commit_subject(commit_id):
     """
     Gets the commit subject line for a given commit ID.
     """
-    result = subprocess.run(
-        ["git", "log", "-1", "--format=%s", commit_id], capture_output=True, text=True
-    )
-
-    if result.returncode != 0:
-        return "Unknown"
-
-    return result.stdout.strip()
+    return commit_reader.get_subject(commit_id)
 
 
 def parse_commit(commit_id):
     """
-    Extracts the kernel version, test profiles, and failures from a git commit.
+    Extracts the kernel version, test profiles, and failures from a git commit,
+    and the filesystem they are for.
     """
     # Get the commit log
-    result = subprocess.run(
-        ["git", "show", "--no-patch", "--format=%B", commit_id],
-        capture_output=True,
-        text=True,
-    )
+    log = commit_reader.get_message(commit_id)
 
-    if result.returncode != 0:
+    if log is None:
         print(f"Error: Failed to retrieve commit {commit_id}")
         sys.exit(1)
 
-    log = result.stdout
-
     # Extract kernel version
-    kernel_match = re.search(r"KERNEL:\s+(.*?)\n", log)
-    kernel_version = kernel_match.group(1).strip() if kernel_match else "Unknown"
+    message = tokenize_commit_message(log)
+    kernel_version = message.header.kernel or "Unknown"
 
-    # Parse test profiles and their failures
+    # Parse test profiles and their failures, including multi-line failure
+    # lists, from the profile sections of any filesystem test profile
     profiles = defaultdict(list)
 
-    # Find all profile sections - modified to work with any filesystem test profile
-    # and to properly capture multi-line failure lists
-    profile_pattern = r"^((?:\w+_)+\w+): (\d+) tests,.*?\n(?:.*?\n)*?  Failures:(.*?)(?=\n(?:\w+_)+\w+: |\nTotals: |\n\n|\Z)"
-    profile_sections = re.finditer(profile_pattern, log, re.MULTILINE | re.DOTALL)
-
-    for match in profile_sections:
-        profile = match.group(1)
-        # Extract all failures, handling multi-line lists
-        failures_text = match.group(3).strip()
-        # Split by whitespace and filter out empty strings
-        failures = [f for f in re.split(r'\s+', failures_text) if f]
+    for section in message.sections:
+        profile, counts, failures = parse_profile_section(section)
         profiles[profile] = failures
 
-    return kernel_version, profiles
+    fs_type = determine_filesystem_type(get_commit_subject(commit_id), log,
+                                        get_profile_names(message))
+
+    return kernel_version, profiles, fs_type
+
+
+def load_flakiness(index_path, fs_type):
+    """
+    Score the flakiness of the tests of a filesystem over the history in
+    the fstests runs of the results index, updating the index first.
+    Returns {(profile, test): FlakinessScore}, empty if the index cannot be
+    used.
+    """
+    if not fs_type:
+        return {}
+
+    # The progress of the index update goes to stderr, to keep it apart from
+    # the comparison
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            store = open_results_index(index_path)
+    except ValueError as e:
+        print(f"Warning: Not using flakiness scores: {e}")
+        return {}
+
+    scores = score_flakiness(get_failure_history(store, test_type=DEFAULT_TEST_TYPE,
+                                                 filesystem=fs_type))
+    store.close()
+    return {(profile, test): score for (filesystem, profile, test), score in scores.items()}
+
+
+def format_flakiness(score):
+    """
+    Describe the failure history of a flaky test.
+    """
+    return (f"failed {score.failures} of {score.runs} runs, "
+            f"{score.failure_probability:.0%} [{score.ci_low:.0%}-{score.ci_high:.0%}], "
+            f"flip rate {score.flip_rate:.2f}")
 
 
 def is_failure_present_in_any_profile(failure, profiles):
@@ -68,9 +98,11 @@ def is_failure_present_in_any_profile(failure, profiles):
     return any(failure in failures for failures in profiles.values())
 
 
-def compare_results(baseline_id, test_id, verbose=False):
+def compare_results(baseline_id, test_id, verbose=False, index_path=None):
     """
     Compare test results between baseline and new test commit.
+    With index_path new failures of tests which are flaky according to the
+    history in that results index are not counted as regressions.
     """
     print("Comparing commits:")
     baseline_subject = get_commit_subject(baseline_id)
@@ -80,8 +112,10 @@ def compare_results(baseline_id, test_id, verbose=False):
     print(f"{'Test:':<15}{test_id[:12]} | {test_subject}")
     print()
 
-    baseline_kernel, baseline_profiles = parse_commit(baseline_id)
-    test_kernel, test_profiles = parse_commit(test_id)
+    baseline_kernel, baseline_profiles, baseline_fs = parse_commit(baseline_id)
+    test_kernel, test_profiles, test_fs = parse_commit(test_id)
+
+    flakiness = load_flakiness(index_path, test_fs) if index_path else {}
 
     print(f"{'Baseline Kernel:':<15}{baseline_kernel}")
     print(f"{'Test Kernel:':<15}{test_kernel}")
@@ -101,6 +135,7 @@ def compare_results(baseline_id, test_id, verbose=False):
 
     found_changes = False
     total_regressions = 0
+    total_flaky = 0
     total_fixes = 0
     total_unchanged = 0
 
@@ -109,6 +144,13 @@ def compare_results(baseline_id, test_id, verbose=False):
         test_failures = set(test_profiles.get(profile, []))
 
         new_failures = test_failures - baseline_failures
+        # New failures of flaky tests are expected every now and then
+        flaky_failures = {
+            failure
+            for failure in new_failures
+            if is_flaky(flakiness.get((profile, failure)))
+        }
+        new_failures -= flaky_failures
         potential_resolved = baseline_failures - test_failures
 
         # Only consider a failure resolved if it's not present in any other test profile
@@ -136,6 +178,9 @@ def compare_results(baseline_id, test_id, verbose=False):
                     if test in new_failures:
                         status_indicator = "--> regression"
                         total_regressions += 1
+                    elif test in flaky_failures:
+                        status_indicator = "--> flaky"
+                        total_flaky += 1
                     elif test in resolved_failures:
                         status_indicator = "--> fixed"
                         total_fixes += 1
@@ -144,7 +189,7 @@ def compare_results(baseline_id, test_id, verbose=False):
                         
                     print(f"{test:19} | {baseline_status:<12} | {test_status:<12} {status_indicator}")
             
-        elif new_failures or resolved_failures:
+        elif new_failures or flaky_failures or resolved_failures:
             found_changes = True
             print(f"\nProfile: {profile}")
 
@@ -154,6 +199,13 @@ def compare_results(baseline_id, test_id, verbose=False):
                     print(f"    + {failure}")
                 total_regressions += len(new_failures)
 
+            if flaky_failures:
+                print("  Flaky Failures:")
+                for failure in sorted(flaky_failures):
+                    score = flakiness[(profile, failure)]
+                    print(f"    ~ {failure} ({format_flakiness(score)})")
+                total_flaky += len(flaky_failures)
+
             if resolved_failures:
                 print("  Resolved Failures:")
                 for failure in sorted(resolved_failures):
@@ -163,6 +215,8 @@ def compare_results(baseline_id, test_id, verbose=False):
     if verbose:
         print("\nSummary:")
         print(f"  - Total regressions: {total_regressions}")
+        if flakiness:
+            print(f"  - Flaky failures: {total_flaky}")
         print(f"  - Total fixes: {total_fixes}")
         print(f"  - Unchanged failures: {total_unchanged}")
     elif not found_changes:
@@ -177,9 +231,15 @@ def main():
     parser.add_argument("test", help="Test commit ID")
     parser.add_argument("-v", "--verbose", action="store_true", 
                        help="Show verbose output with detailed comparison tables")
+    parser.add_argument("--index", nargs="?", const=INDEX_FILE,
+                        help="Do not count new failures of tests which are flaky according "
+                             "to this results index of bin/query-results.py as regressions, "
+                             "the index is created or updated as needed "
+                             "(default without a path: " + INDEX_FILE + ")")
     
     args = parser.parse_args()
-    compare_results(args.baseline, args.test, args.verbose)
+    compare_results(args.baseline, args.test, args.verbose, args.index)
+    commit_reader.close()
 
 
 if __name__ == "__main__":
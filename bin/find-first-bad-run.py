@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import os
+import json
+import argparse
+import contextlib
+
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.first_bad_run import find_first_bad_run, get_bisect_refs
+from lib.kernel_version import MAINLINE_SERIES, NEXT_SERIES
+from lib.results_index import INDEX_FILE, open_results_index
+
+
+def format_run(run):
+    """
+    Describe a run on one line.
+    """
+    return f"{run['kernel']} ({run['date']}, {run['commit'][:12]})"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the run in which a failing fstests test started failing, "
+                    "with the runs ordered by kernel version"
+    )
+    parser.add_argument("-t", "--test", required=True, help="Test, for example generic/751")
+    parser.add_argument("-p", "--profile", required=True, help="Profile, for example ext4_defaults")
+    parser.add_argument("-f", "--filesystem", help="Only consider runs of this filesystem")
+    parser.add_argument("--next", action="store_true",
+                        help="Search the linux-next runs instead of the mainline and stable ones")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    parser.add_argument("--index", default=INDEX_FILE,
+                        help="Index file (default: " + INDEX_FILE + ")")
+    parser.add_argument("--no-update", action="store_true",
+                        help="Use the index as is, without adding new commits first")
+    parser.add_argument("-c", "--commit", default="HEAD",
+                        help="Index the history up to this commit (default: HEAD)")
+    args = parser.parse_args()
+
+    # Indexing progress must not end up in the result
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            store = open_results_index(args.index, args.commit, not args.no_update)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    series = NEXT_SERIES if args.next else MAINLINE_SERIES
+    result = find_first_bad_run(store, args.test, args.profile, args.filesystem, series)
+    store.close()
+
+    if not result:
+        print(f"{args.test} does not fail in the latest {args.profile} run")
+        return
+
+    bad, good = get_bisect_refs(result)
+
+    if args.json:
+        print(json.dumps({
+            'test': args.test,
+            'profile': args.profile,
+            'good': result.good,
+            'bad': result.bad,
+            'good_ref': good,
+            'bad_ref': bad,
+            'checked': result.checked,
+            'runs': result.runs,
+        }, indent=2))
+        return
+
+    print(f"{args.test} on {args.profile}, checked {result.checked} of {result.runs} runs:")
+    if result.good:
+        print(f"  last good: {format_run(result.good)}")
+        print(f"  first bad: {format_run(result.bad)}")
+    else:
+        print(f"  already failing in the oldest run ({format_run(result.bad)})")
+
+    if good == bad:
+        print()
+        print("Both runs tested the same kernel, the failure did not come from a kernel change")
+    elif good:
+        print()
+        print("To bisect in a linux tree:")
+        print(f"  git bisect start {bad} {good}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,13 @@
 
 import sys
 import os
-import re
 import subprocess
 import argparse
 import json
 import shutil
+import hashlib
+import multiprocessing
+from functools import partial
 from collections import defaultdict
 from datetime import datetime
 import importlib.util
@@ -16,266 +18,185 @@ import importlib.util
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Now imports should work correctly
-from lib.fs_handler import process_data as process_fs_data
-from lib.mm_handler import process_data as process_mm_data
-from lib.kdevops_handler import process_data as process_kdevops_data
+from lib.handlers import get_handler
+from lib.git_reader import (CommitReader, get_root_commit, is_ancestor, iter_commit_records,
+                            list_commits)
+from lib import commit_parser
+from lib.commit_parser import get_parser_version
+from lib.parse_cache import ParseCache
+from lib.index_accumulator import IndexAccumulator, load_existing_rows
+from lib.ingested_records import load_records
+from lib.results_store import ResultsStore
+from lib.flakiness import (FLAKINESS_FILE, get_failure_history, get_flakiness_rows,
+                           score_flakiness)
+from lib.output_writer import (OutputWriter, COMPRESSORS, brotli, format_json,
+                               load_output_hashes)
+from lib.static_assets import (STATIC_DIR, get_asset_problems, get_vendored_assets, link_assets,
+                               write_static_assets)
+
+# All single commit lookups are served by one git cat-file process
+commit_reader = CommitReader()
 
 # Common utility functions
 def get_commit_subject(commit_id):
     """
     Gets the commit subject line for a given commit ID.
     """
-    result = subprocess.run(
-        ["git", "log", "-1", "--format=%s", commit_id], capture_output=True, text=True
-    )
-
-    if result.returncode != 0:
-        return "Unknown"
-
-    return result.stdout.strip()
+    return commit_reader.get_subject(commit_id)
 
 
 def get_commit_date(commit_id):
     """
     Gets the commit date for a given commit ID.
     """
-    result = subprocess.run(
-        ["git", "log", "-1", "--format=%ai", commit_id], capture_output=True, text=True
-    )
-
-    if result.returncode != 0:
-        return "Unknown"
-
-    return result.stdout.strip()
+    return commit_reader.get_date(commit_id)
 
 
-def parse_kernel_version(kernel_version):
+def parse_commit_results(commit_id, record=None):
     """
-    Parse kernel version string to extract base version and commit hash.
-    Examples:
-    - 6.15.0-rc2-g57265e6ac675 -> (6.15.0-rc2, 57265e6ac675)
-    - 6.15.0-g57265e6ac675 -> (6.15.0, 57265e6ac675)
-    - next-20250321-g1234abcd -> (next-20250321, 1234abcd)
+    Parse a commit and let its handler parse the results.
+    If record is given it is the (subject, date, log) of the commit as already
+    retrieved and git is not queried again.
+    Returns (test_type, data), test_type or data is None if there is nothing
+    to write.
     """
-    # Pattern for standard kernel versions with git hash
-    standard_pattern = re.compile(r'^(\d+\.\d+(?:\.\d+)?(?:-\w+\d+)?(?:-\w+\d+)?)-g([a-f0-9]+)$')
-    # Pattern for linux-next tags
-    next_pattern = re.compile(r'^(next-\d+)-g([a-f0-9]+)$')
-    
-    match = standard_pattern.match(kernel_version)
-    if match:
-        return match.group(1), match.group(2)
-    
-    match = next_pattern.match(kernel_version)
-    if match:
-        return match.group(1), match.group(2)
-    
-    # If no pattern matches, return the original and empty hash
-    return kernel_version, ""
+    if not record:
+        # Get the commit log, subject and date in one lookup
+        commit = commit_reader.read(commit_id)
+
+        if not commit:
+            print(f"Error: Failed to retrieve commit {commit_id}")
+            sys.exit(1)
 
+        commit_id = commit['commit']
+        record = (commit['subject'], commit['date'], commit['log'])
 
-def is_vanilla_release(subject, base_version):
+    return commit_parser.parse_commit_results(commit_id, *record)
+
+
+def prepare_commit(commit_id, record=None, parsed=None, compact=False):
     """
-    Determine if this is an official vanilla kernel release.
+    Parse a commit, unless parsed already holds the result of
+    parse_commit_results() for it, and render its dashboard files, minified
+    if compact is set.
+    Returns (parsed, prepared) where prepared is (test_type, data, rendered)
+    or None if there is nothing to write.
+    This does not touch the output directory so it can run in a worker.
     """
-    # Check if subject contains "Linux version" and the base version
-    if "Linux" in subject and base_version in subject:
-        return True
-    
-    # Look for patterns indicating an official release tag
-    if re.search(r'Linux \d+\.\d+(?:\.\d+)?(?:-rc\d+)?', subject):
-        return True
-    
-    return False
+    if parsed is None:
+        parsed = parse_commit_results(commit_id, record)
+
+    test_type, data = parsed
+    if not test_type or data is None:
+        return parsed, None
 
+    return parsed, (test_type, data, get_handler(test_type).render_data(data, compact))
 
-def get_kernel_type(base_version):
+
+def prepare_commit_task(task, compact=False):
     """
-    Determine the kernel type based on the base version.
-    Returns one of: 'stable', 'vanilla', 'rc', 'next', 'development'
+    Pool friendly wrapper around prepare_commit() for a task yielded by
+    iter_commit_tasks().
     """
-    if base_version.startswith("next-"):
-        return "next"
-    
-    if "-rc" in base_version:
-        return "rc"
-    
-    # Check if it's a stable version (has three version components)
-    version_parts = re.findall(r'\d+', base_version)
-    if len(version_parts) >= 3 and int(version_parts[2]) > 0:
-        return "stable"
-    
-    # If it has just major.minor or major.minor.0, it's a vanilla release
-    if len(version_parts) >= 2:
-        if len(version_parts) == 2 or int(version_parts[2]) == 0:
-            return "vanilla"
-    
-    # Default to development
-    return "development"
+    commit_id, record, parsed = task
+    from_cache = parsed is not None
+    return (commit_id, from_cache) + prepare_commit(commit_id, record, parsed, compact)
 
 
-def parse_commit(commit_id):
+def get_commit_tarballs(revisions):
     """
-    Extracts information from a git commit and determines the test type.
-    Returns the parsed data or None if not a relevant test commit.
+    Get the paths of the result tarballs added or changed by the commits
+    git log lists for revisions, as {commit_id: [path]}. The tarballs of a
+    whole range of commits are listed by a single git log.
     """
-    # Get the commit log
     result = subprocess.run(
-        ["git", "show", "--no-patch", "--format=%B", commit_id],
-        capture_output=True,
-        text=True,
+        ["git", "log", "-z", "--format=%x01%H", "--name-only", "--no-renames",
+         "--diff-filter=d"] + revisions + ["--", ":(top)*.xz"],
+        capture_output=True, text=True
     )
-
     if result.returncode != 0:
-        print(f"Error: Failed to retrieve commit {commit_id}")
-        sys.exit(1)
-
-    log = result.stdout
+        return {}
 
-    # Get subject from the commit
-    subject = get_commit_subject(commit_id)
-    
-    # Skip CI verification commits with "kdevops:" subject prefix 
-    # but containing "CI:" in the subject (these are CI verification commits)
-    if subject.startswith("kdevops:") and "CI:" in subject:
-        print(f"Skipping CI verification commit: {commit_id} ('{subject}')")
-        return None
-
-    # Determine test type
-    test_type = None
-    
-    # Check for kdevops bringup/test commits we want to include
-    if subject.startswith("kdevops:") and "CI:" not in subject:
-        # This is a kdevops test we want to track
-        workflow_match = re.search(r"workflow:\s+(.*?)\n", log)
-        if workflow_match and "fstests" in workflow_match.group(1).lower():
-            test_type = "kdevops"
-        else:
-            return None  # Not a kdevops test workflow we're tracking
-    elif "linux-mm-kpd:" in subject:
-        test_type = "mm"
-        workflow_match = re.search(r"workflow:\s+(.*?)\n", log)
-        if not workflow_match or "selftests" not in workflow_match.group(1).lower():
-            return None  # Not a memory management selftest workflow
-    else:
-        # Check if this is an fstests workflow commit
-        workflow_match = re.search(r"workflow:\s+(.*?)\n", log)
-        if not workflow_match or "fstests" not in workflow_match.group(1).lower():
-            return None  # Not an fstests workflow commit
-        test_type = "fs"
-
-    # Extract kernel version
-    kernel_match = re.search(r"KERNEL:\s+(.*?)\n", log)
-    if kernel_match:
-        kernel_version = kernel_match.group(1).strip()
-    else:
-        # For MM tests, try to find kernel version in other formats
-        kernel_match = re.search(r"workflows/selftests/results/last-run/([\d\.\w-]+[\+]?)/", log)
-        if kernel_match:
-            kernel_version = kernel_match.group(1).strip()
-        else:
-            kernel_version = "Unknown"
-
-    # Extract test number if available (useful for kdevops tests)
-    test_number_match = re.search(r"test number:\s+(\d+)", log)
-    test_number = test_number_match.group(1) if test_number_match else None
-
-    # Extract CPU count if available
-    cpu_match = re.search(r"CPUS:\s+(\d+)", log)
-    cpu_count = cpu_match.group(1) if cpu_match else "Unknown"
-    
-    # Parse kernel version to extract base version and commit
-    base_version, commit_hash = parse_kernel_version(kernel_version)
-    
-    # Determine if this is an official tag release
-    is_vanilla = is_vanilla_release(subject, base_version)
-    kernel_type = get_kernel_type(base_version)
-
-    # Build base data structure with common properties
-    data = {
-        'commit': commit_id,
-        'subject': subject,
-        'kernel': kernel_version,
-        'base_version': base_version,
-        'commit_hash': commit_hash,
-        'is_vanilla': is_vanilla,
-        'kernel_type': kernel_type,
-        'cpus': cpu_count,
-        'date': get_commit_date(commit_id),
-        'test_type': test_type,
-        'log': log  # Include the full log for module processing
-    }
-    
-    # Add test number if available (for kdevops tests)
-    if test_number:
-        data['test_number'] = test_number
+    # Each commit is "\x01<commit ID>\0\n" followed by its paths, each
+    # terminated by a NUL
+    tarballs = {}
+    for entry in result.stdout.split('\x01')[1:]:
+        commit_id, *paths = entry.split('\0')
+        tarballs[commit_id] = [path.lstrip('\n') for path in paths if path.strip('\n')]
+    return tarballs
 
-    return data
 
-def should_process_with_fs_handler(tree, subject):
+def get_commit_tests(revisions, ingested):
     """
-    Determines if a commit should be processed with fs_handler.py.
+    Get the per test results of the tarballs of the commits git log lists
+    for revisions, as recorded by bin/ingest-results.py, by commit ID.
     """
+    commit_tests = {}
+    if not ingested:
+        return commit_tests
 
-    # Valid trees to process.
-    valid_trees = ["linux", "linux-next", "linux-stable"]
+    for commit_id, paths in get_commit_tarballs(revisions).items():
+        tests = []
+        for path in paths:
+            record = ingested.get(path)
+            if record:
+                tests.extend(record.get('tests', []))
+        if tests:
+            commit_tests[commit_id] = tests
 
-    # Valid subjects
-    valid_subjects = ["linux-xfs-kpd", "linux-ext4-kpd", "linux-btrfs-kpd", "linux-tmpfs-kpd"]
+    return commit_tests
 
-    # kdevops will *always* test fstests, but we don't want those tests
-    # to be counted as valid fstests, those test are simply done to ensure
-    # we can build linux, build fstests, and run at least one test.
-    if subject.startswith("kdevops:") or subject.startswith("kdevops-kpd:"):
-        return False
 
-    # Check if the tree matches one of the valid trees we support
-    if tree not in valid_trees:
-        return True
-
-    # Check if the tree matches one of the valid trees we support
-    if subject not in valid_subjects:
-        return True
+def write_commit(prepared, output_dir, index, writer, commit_tests=None):
+    """
+    Write the dashboard files for a commit returned by prepare_commit() and
+    add it to the index accumulator, and its per test results from
+    commit_tests, as returned by get_commit_tests(), to the results store.
+    Commits are written one at a time, as the handlers pick file names based
+    on the runs already written, which run ends up with which name does not
+    depend on the order though, see lib/run_names.py.
+    """
+    test_type, data, rendered = prepared
+    html_path = get_handler(test_type).write_data(data, output_dir, index, writer, rendered)
+    tests = commit_tests.get(data['commit']) if commit_tests else None
+    if html_path and tests and index.store:
+        index.store.add_tests(data['commit'], tests)
+    return html_path
 
-    return False
 
-def generate_dashboard(commit_id, output_dir='.'):
+def generate_dashboard(commit_id, output_dir, index, writer, commit_tests=None):
     """
     Generate a dashboard HTML file and associated JSON data for the given commit.
+    The index pages are updated when index is flushed.
     """
-    print(f"Parsing commit {commit_id}...")
-    data = parse_commit(commit_id)
-
-    if not data:
-        print(f"Commit {commit_id} is not a relevant test commit. Skipping.")
-        return None
-
-    # Determine the tree from the commit log
-    tree_match = re.search(r"tree:\s+(.*?)\n", data['log'])
-    tree = tree_match.group(1).strip() if tree_match else "unknown"
-
-    # Process data based on test type
-    if data['test_type'] == 'fs' and should_process_with_fs_handler(tree, data['subject']):
-        result = process_fs_data(data, output_dir)
-    elif data['test_type'] == 'mm':
-        result = process_mm_data(data, output_dir)
-    elif data['test_type'] == 'kdevops':
-        result = process_kdevops_data(data, output_dir)
-    else:
-        print(f"Unknown or unsupported test type for commit {commit_id}: {data['test_type']}")
+    parsed, prepared = prepare_commit(commit_id, compact=writer.compact)
+    if not prepared:
         return None
 
-    # Update the main index
-    create_master_index(output_dir)
-    return result
+    return write_commit(prepared, output_dir, index, writer, commit_tests)
 
-def create_master_index(output_dir):
+def write_flakiness(output_dir, writer, store):
+    """
+    Score the flakiness of the tests of every filesystem from the history
+    of its runs in the results store and write it next to its index.
+    """
+    scores = score_flakiness(get_failure_history(store, test_type='fs'))
+    for fs_type in sorted({filesystem for filesystem, profile, test in scores}):
+        fs_dir = os.path.join(output_dir, fs_type)
+        if not os.path.isdir(fs_dir):
+            continue
+        rows = get_flakiness_rows(scores, fs_type)
+        flakiness_path = os.path.join(fs_dir, FLAKINESS_FILE)
+        if writer.write(flakiness_path, format_json(rows, 2, writer.compact)):
+            print(f"Flakiness scores written to {flakiness_path}")
+
+
+def create_master_index(output_dir, writer, store):
     """
     Create a master index.html page that links to each filesystem directory.
     """
-    # Find all subdirectories (filesystem types)
-    subdirs = [d for d in os.listdir(output_dir)
-               if os.path.isdir(os.path.join(output_dir, d)) and not d.startswith('.')]
+    # Every subdirectory holding runs (filesystem types), from the results store
+    subdirs = sorted({index_dir.split(os.sep)[0] for index_dir in store.get_index_dirs()})
 
     if not subdirs:
         print("No test directories found, skipping master index creation")
@@ -534,47 +455,310 @@ def create_master_index(output_dir):
 
     # Write the master index.html
     index_path = os.path.join(output_dir, 'index.html')
-    with open(index_path, 'w') as f:
-        f.write(html)
+    if writer.write(index_path, link_assets(html, "")):
+        print(f"Master index created at {index_path}")
+
+def load_cached_commit(cache, commit_id):
+    """
+    Get the (test_type, data) of a commit from the parse cache, or None if
+    it is not cached or was parsed by an older parser.
+    """
+    entry = cache.get(commit_id)
+    if not entry:
+        return None
+
+    test_type, version, data = entry
+    if version != get_parser_version(test_type):
+        return None
 
-    print(f"Master index created at {index_path}")
+    return test_type, data
 
-def process_commits_in_range(start_commit=None, end_commit="HEAD", output_dir="dashboard"):
+
+def iter_commit_tasks(start_commit, end_commit, cache=None):
+    """
+    Yields (commit_id, record, parsed) for every commit in the range. Commits
+    found in the parse cache come with their parsed results and are not
+    read from git at all, the others come with their (subject, date, log),
+    all pulled with a single git log stream.
+    """
+    if not cache:
+        # Pull the whole range in one go
+        for commit_id, subject, date, log in iter_commit_records(start_commit, end_commit):
+            yield commit_id, (subject, date, log), None
+        return
+
+    commit_ids = list_commits(start_commit, end_commit)
+    versions = cache.get_versions()
+    current = {test_type: get_parser_version(test_type) for test_type, version in versions.values()}
+    uncached = [commit_id for commit_id in commit_ids
+                if commit_id not in versions or
+                versions[commit_id][1] != current[versions[commit_id][0]]]
+
+    records = iter(())
+    if uncached:
+        records = iter_commit_records(start_commit, end_commit, uncached)
+    uncached = set(uncached)
+
+    for commit_id in commit_ids:
+        if commit_id not in uncached:
+            yield commit_id, None, load_cached_commit(cache, commit_id)
+            continue
+
+        record_id, subject, date, log = next(records)
+        yield commit_id, (subject, date, log), None
+
+
+def import_existing_runs(output_dir, store, shell=False):
+    """
+    Import the runs of a dashboard written before the results store
+    existed, from the manifest or else the files of each directory, shell
+    being set if it was written with --shell.
+    """
+    for name in sorted(os.listdir(output_dir)):
+        index_dir = os.path.join(output_dir, name)
+        if name.startswith('.') or name == STATIC_DIR or not os.path.isdir(index_dir):
+            continue
+
+        handler = get_handler(name if name in ['mm', 'kdevops'] else 'fs')
+        for row in load_existing_rows(index_dir, handler.load_index_rows, shell):
+            store.add_run(name, row)
+
+
+def process_commits_in_range(start_commit=None, end_commit="HEAD", output_dir="dashboard", jobs=1,
+                             cache=None, options=None, ingested=None):
     """
     Process a range of commits from start_commit to end_commit.
     If start_commit is None, process only the end_commit.
+    With more than one job commits are parsed and rendered in a process pool
+    while the results are still written out in commit order. Commits found
+    in the parse cache skip git and parsing, newly parsed ones are added.
+    options holds the output options passed to OutputWriter: shell, compact
+    and precompress. ingested holds the tarball records of
+    bin/ingest-results.py by path, the per test results of the runs are
+    taken from them.
     """
-    if start_commit:
-        # Get list of commits in range
-        result = subprocess.run(
-            ["git", "log", "--pretty=format:%H", f"{start_commit}..{end_commit}"],
-            capture_output=True, text=True
-        )
-        
-        if result.returncode != 0:
-            print(f"Error: Failed to retrieve commit range {start_commit}..{end_commit}")
-            sys.exit(1)
-            
-        commits = result.stdout.strip().split('\n')
-        if not commits[0]:  # Handle empty result
-            commits = []
-    else:
-        # Just process the end commit
-        commits = [end_commit]
-    
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
-    
-    # Process each commit
+
+    # Files are only written when their content changes and index pages
+    # are only rendered once all commits have been written
+    writer = OutputWriter(output_dir, **(options or {}))
+
+    # Every run goes to the results store, the index pages are rendered from it
+    store_path = os.path.join(output_dir, RESULTS_STORE_FILE)
+    new_store = not os.path.exists(store_path)
+    store = ResultsStore(store_path)
+    if new_store:
+        import_existing_runs(output_dir, store, writer.shell)
+
+    index = IndexAccumulator(writer, store)
+
+    # The per test results of every commit to process, from their tarballs
+    revisions = [f"{start_commit}..{end_commit}"] if start_commit else [f"{end_commit}^!"]
+    commit_tests = get_commit_tests(revisions, ingested)
+
     processed_commits = 0
-    for commit in commits:
-        if generate_dashboard(commit, output_dir):
+    if start_commit:
+        tasks = iter_commit_tasks(start_commit, end_commit, cache)
+        if jobs > 1:
+            # The pool consumes tasks from its own thread, so do the git and
+            # parse cache lookups up front
+            tasks = list(tasks)
+            pool = multiprocessing.Pool(jobs)
+            results = pool.imap(partial(prepare_commit_task, compact=writer.compact), tasks,
+                                 chunksize=8)
+        else:
+            pool = None
+            results = map(partial(prepare_commit_task, compact=writer.compact), tasks)
+
+        for commit_id, from_cache, parsed, prepared in results:
+            if cache and not from_cache:
+                test_type, data = parsed
+                cache.put(commit_id, test_type, get_parser_version(test_type), data)
+            if prepared and write_commit(prepared, output_dir, index, writer, commit_tests):
+                processed_commits += 1
+
+        if pool:
+            pool.close()
+            pool.join()
+    else:
+        # Just process the end commit
+        if generate_dashboard(end_commit, output_dir, index, writer, commit_tests):
             processed_commits += 1
-    
+
+    commit_reader.close()
     print(f"Processed {processed_commits} test workflow commits")
+
+    # Render the index of every subsystem that got new runs
+    index.flush()
+
+    # Score flaky tests over the whole history
+    write_flakiness(output_dir, writer, store)
     
+    # Copy the assets the pages link to
+    write_static_assets(output_dir, writer)
+
     # Create a master index page
-    create_master_index(output_dir)
+    create_master_index(output_dir, writer, store)
+    store.close()
+
+    # Record what changed for deploys
+    writer.close()
+
+
+# Hidden files at the top of the output directory are our own bookkeeping,
+# they are not part of the generated dashboard.
+# File recording what an incremental run last saw
+STATE_FILE = '.dashboard-state.json'
+# Default parse cache location
+PARSE_CACHE_FILE = '.parse-cache.sqlite'
+# Results store the index pages are rendered from
+RESULTS_STORE_FILE = '.results.sqlite'
+# Default tarball records written by bin/ingest-results.py
+INGESTED_FILE = 'ingested-results.jsonl'
+
+
+def compute_output_digest(output_dir):
+    """
+    Compute a digest over the relative paths, content hashes and sizes of
+    all generated files in the output directory. The content hashes are the
+    ones OutputWriter recorded when writing each file, so no file is read,
+    only the size of each is looked up to notice files removed or changed
+    since.
+    """
+    digest = hashlib.sha256()
+    for rel_path, file_hash in sorted(load_output_hashes(output_dir).items()):
+        try:
+            size = os.path.getsize(os.path.join(output_dir, rel_path))
+        except OSError:
+            size = -1
+        digest.update(f"{rel_path}\0{file_hash}\0{size}\0".encode())
+    return digest.hexdigest()
+
+
+def load_dashboard_state(output_dir):
+    """
+    Load the state saved by the last incremental run, or None if there is
+    no usable state.
+    """
+    state_path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {state_path}: {e}")
+        return None
+
+    if not state.get('last_commit') or not state.get('digest'):
+        return None
+
+    return state
+
+
+def get_static_asset_names():
+    """
+    Get the hashed names of the vendored assets the pages link to.
+    """
+    return sorted(hashed_name for path, hashed_name in get_vendored_assets().values())
+
+
+def save_dashboard_state(output_dir, last_commit, options=None):
+    """
+    Record the last processed commit, the output options, the static assets
+    linked to and a digest of the generated output.
+    """
+    state = {
+        'last_commit': last_commit,
+        'digest': compute_output_digest(output_dir),
+        'options': options or {},
+        'static_assets': get_static_asset_names(),
+    }
+    state_path = os.path.join(output_dir, STATE_FILE)
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=2)
+
+    print(f"Dashboard state saved at {state_path}")
+
+
+def clear_output_dir(output_dir):
+    """
+    Remove all generated files from the output directory.
+    """
+    for name in os.listdir(output_dir):
+        if name.startswith('.'):
+            continue
+        path = os.path.join(output_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def has_generated_files(output_dir):
+    """
+    Check whether the output directory holds anything but bookkeeping files.
+    """
+    return os.path.isdir(output_dir) and any(
+        not name.startswith('.') for name in os.listdir(output_dir))
+
+
+def process_commits_incrementally(end_commit="HEAD", output_dir="dashboard", jobs=1, cache=None,
+                                  options=None, ingested=None):
+    """
+    Process only the commits added since the last incremental run into the
+    existing output directory. Falls back to a full rebuild from the root
+    commit if there is no saved state, the output was modified since, or
+    history was rewritten so the last processed commit is gone, as happens
+    when the archive is rotated to a new epoch. Changing the output options
+    also rebuilds, so all files are written the same way.
+    """
+    commit = commit_reader.read(end_commit)
+    if not commit:
+        print(f"Error: Failed to retrieve commit {end_commit}")
+        sys.exit(1)
+    end_commit = commit['commit']
+
+    state = load_dashboard_state(output_dir)
+    start_commit = None
+
+    if not state:
+        reason = "no previous dashboard state found"
+    elif state['digest'] != compute_output_digest(output_dir):
+        reason = "generated files changed since the last run"
+    elif state.get('options', {}) != (options or {}):
+        reason = "output options changed since the last run"
+    elif state.get('static_assets') != get_static_asset_names():
+        reason = "static assets changed since the last run"
+    elif not is_ancestor(state['last_commit'], end_commit):
+        reason = f"history was rewritten, {state['last_commit'][:12]} is no longer an ancestor"
+    else:
+        start_commit = state['last_commit']
+
+    if start_commit == end_commit:
+        print(f"Dashboard is already up to date with {end_commit[:12]}")
+        return
+
+    if start_commit:
+        print(f"Incremental update from {start_commit[:12]} to {end_commit[:12]}")
+    else:
+        print(f"Full rebuild: {reason}")
+        if state or os.path.exists(os.path.join(output_dir, STATE_FILE)):
+            # Only wipe directories we know were generated by us
+            clear_output_dir(output_dir)
+        elif has_generated_files(output_dir):
+            print(f"Error: {output_dir} is not empty and was not generated with --incremental, remove it first")
+            sys.exit(1)
+        # The runs of the results store go along with their files
+        store_path = os.path.join(output_dir, RESULTS_STORE_FILE)
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        start_commit = get_root_commit(end_commit)
+
+    process_commits_in_range(start_commit, end_commit, output_dir, jobs, cache, options, ingested)
+    save_dashboard_state(output_dir, end_commit, options)
 
 
 def main():
@@ -587,10 +771,71 @@ def main():
                         help="Start commit for processing a range (if omitted, only the specified commit is processed)")
     parser.add_argument("-o", "--output-dir", default="dashboard", 
                        help="Output directory (default: dashboard)")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="Only process commits added since the last incremental run, "
+                             "falling back to a full rebuild when needed")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes used to parse and render commits (default: 1)")
+    parser.add_argument("--shell", action="store_true",
+                        help="Write one shared run.html per subsystem which fetches the JSON "
+                             "of each run, instead of one HTML page per run")
+    parser.add_argument("--compact", action="store_true",
+                        help="Write minified JSON with sorted keys")
+    parser.add_argument("--precompress", action="append", choices=sorted(COMPRESSORS), default=[],
+                        help="Also write a precompressed sibling of every HTML, JSON and JS file "
+                             "with this encoding, can be repeated")
     
-    args = parser.parse_args()
+    parser.add_argument("--parse-cache",
+                        help="Parse cache file (default: <output-dir>/" + PARSE_CACHE_FILE + ")")
+    parser.add_argument("--no-parse-cache", action="store_true",
+                        help="Parse every commit, without reading or updating the parse cache")
+    parser.add_argument("--ingested", default=INGESTED_FILE,
+                        help="Tarball records written by bin/ingest-results.py to take the per "
+                             "test results of the runs from, if present (default: " +
+                             INGESTED_FILE + ")")
+    parser.add_argument("--remote-assets", action="store_true",
+                        help="Generate the dashboard even if some static assets are not vendored, "
+                             "pages load those from their remote URL")
     
-    process_commits_in_range(args.start_commit, args.commit, args.output_dir)
+    args = parser.parse_args()
+
+    if args.incremental and args.start_commit:
+        parser.error("--incremental and --start-commit are mutually exclusive")
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if 'br' in args.precompress and not brotli:
+        parser.error("--precompress br needs the brotli module, install python3-brotli")
+
+    asset_problems = get_asset_problems()
+    if asset_problems and not args.remote_assets:
+        for problem in asset_problems:
+            print(f"Error: {problem}")
+        print("Run ./bin/update-static-assets.py, or pass --remote-assets to load them remotely")
+        sys.exit(1)
+
+    options = {
+        'shell': args.shell,
+        'compact': args.compact,
+        'precompress': sorted(set(args.precompress)),
+    }
+
+    cache = None
+    if not args.no_parse_cache:
+        cache = ParseCache(args.parse_cache or os.path.join(args.output_dir, PARSE_CACHE_FILE))
+
+    ingested = load_records(args.ingested)
+
+    if args.incremental:
+        process_commits_incrementally(args.commit, args.output_dir, args.jobs, cache, options,
+                                      ingested)
+    else:
+        process_commits_in_range(args.start_commit, args.commit, args.output_dir, args.jobs, cache,
+                                 options, ingested)
+
+    if cache:
+        cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import os
+import lzma
+import argparse
+import tempfile
+
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.result_tarball import (TARBALL_ERRORS, LfsPointerError, build_member_index,
+                                find_tarballs, get_index_path, is_lfs_pointer, read_member,
+                                write_member_index)
+from lib.xz_index import compress_multiblock
+
+
+def repack(path, block_size):
+    """
+    Recompress a tarball as multi-block xz, replacing it once complete.
+    """
+    dir_name = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix='.repack-')
+    try:
+        with lzma.open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+            compress_multiblock(src, dst, block_size)
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the sidecar member index of result tarballs, so single members "
+                    "can be read without decompressing the whole tarball"
+    )
+    parser.add_argument("paths", nargs="+",
+                        help="Result tarballs, or directories to search for them")
+    parser.add_argument("--repack", action="store_true",
+                        help="Recompress the tarballs as multi-block xz first")
+    parser.add_argument("--block-size", type=int, default=1 << 20,
+                        help="Uncompressed size of the xz blocks when repacking (default: 1MiB)")
+    parser.add_argument("--cat", metavar="MEMBER",
+                        help="Print MEMBER of the given tarball instead of indexing")
+    args = parser.parse_args()
+
+    if args.cat:
+        if len(args.paths) != 1:
+            parser.error("--cat takes a single tarball")
+        try:
+            content = read_member(args.paths[0], args.cat)
+        except LfsPointerError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        except TARBALL_ERRORS as e:
+            print(f"Error: Failed to read {args.paths[0]}: {e}", file=sys.stderr)
+            sys.exit(1)
+        if content is None:
+            print(f"Error: {args.cat} not found in {args.paths[0]}", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.buffer.write(content)
+        return
+
+    failed = 0
+    for path in find_tarballs(args.paths):
+        if is_lfs_pointer(path):
+            print(f"Skipping {path}, it is a git lfs pointer")
+            continue
+
+        try:
+            if args.repack:
+                repack(path, args.block_size)
+            index = build_member_index(path)
+            write_member_index(path, index)
+        except TARBALL_ERRORS as e:
+            print(f"Error: Failed to index {path}: {e}")
+            failed += 1
+            continue
+
+        print(f"Indexed {path}: {len(index['members'])} members in "
+              f"{len(index['blocks'])} xz blocks, {get_index_path(path)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
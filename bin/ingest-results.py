@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import os
+import time
+import argparse
+
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.ingest import (FAILED, INGESTED, LFS_POINTER, RESULT_DIRS, get_tarball_key,
+                        ingest_tarballs, is_record_current)
+from lib.ingested_records import load_records, save_records
+from lib.result_tarball import find_tarballs
+from lib.paths import REPO_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Decompress and parse result tarballs in bulk, recording what each holds"
+    )
+    parser.add_argument("paths", nargs="*",
+                        help="Result tarballs, or directories to search for them "
+                             "(default: " + ", ".join(RESULT_DIRS) + ")")
+    parser.add_argument("-o", "--output", default="ingested-results.jsonl",
+                        help="JSON lines file of the records, updated in place "
+                             "(default: ingested-results.jsonl)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes decompressing tarballs (default: 1)")
+    parser.add_argument("-q", "--queue-size", type=int,
+                        help="Maximum number of tarballs queued for the processes "
+                             "(default: twice the jobs)")
+    parser.add_argument("-s", "--save-every", type=int, default=100,
+                        help="Save the records after every this many ingested tarballs, so an "
+                             "interrupted run keeps its progress (default: 100)")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Ingest tarballs which already have an up to date record again")
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.queue_size is not None and args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    if args.save_every < 1:
+        parser.error("--save-every must be at least 1")
+
+    paths = args.paths or [os.path.join(REPO_DIR, name) for name in RESULT_DIRS]
+    records = load_records(args.output)
+
+    def is_stale(path):
+        return args.force or not is_record_current(records.get(get_tarball_key(path)), path)
+
+    counts = {INGESTED: 0, LFS_POINTER: 0, FAILED: 0}
+    start = time.monotonic()
+    tarballs = (path for path in find_tarballs(paths) if is_stale(path))
+    try:
+        for path, status, record, seconds in ingest_tarballs(tarballs, args.jobs,
+                                                             args.queue_size):
+            counts[status] += 1
+            done = sum(counts.values())
+            if status == INGESTED:
+                records[record['path']] = record
+                print(f"[{done}] {path}: {record['members']} members, "
+                      f"{len(record['tests'])} tests, {len(record['failures'])} failures "
+                      f"in {seconds:.2f}s")
+                if counts[INGESTED] % args.save_every == 0:
+                    save_records(args.output, records)
+            elif status == LFS_POINTER:
+                print(f"[{done}] Skipping {path}, it is a git lfs pointer")
+            else:
+                print(f"[{done}] Error: Failed to ingest {path}: {record['error']}")
+    finally:
+        # Keep what was ingested even if the run is interrupted
+        save_records(args.output, records)
+
+    print(f"Ingested {counts[INGESTED]} tarballs in {time.monotonic() - start:.2f}s, "
+          f"skipped {counts[LFS_POINTER]} git lfs pointers, {counts[FAILED]} failed")
+
+    if counts[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
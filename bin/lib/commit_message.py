@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import re
+from collections import namedtuple
+
+# Header keys of the test commit messages and the field each one fills
+HEADER_KEYS = {
+    'workflow': 'workflow',
+    'tree': 'tree',
+    'ref': 'ref',
+    'KERNEL': 'kernel',
+    'CPUS': 'cpus',
+    'test number': 'test_number',
+    'test result': 'test_result',
+}
+
+# Header fields which only hold the leading number of their value
+NUMERIC_FIELDS = ('cpus', 'test_number')
+
+# Selftests results may only name the kernel in their results path
+RESULTS_PATH_PREFIX = "workflows/selftests/results/last-run/"
+RESULTS_KERNEL_RE = re.compile(r"[\d\.\w-]+\+?(?=/)")
+
+NUMBER_RE = re.compile(r"\d+")
+
+# Counts following the profile name of a profile line
+PROFILE_COUNTS_RE = re.compile(r": (\d+) tests, (\d+) failures, (\d+) skipped, (\d+) seconds")
+# Start of the failure list of a profile section
+FAILURES_PREFIX = "  Failures:"
+# Totals line of the fstests results
+TOTALS_RE = re.compile(r"Totals: (\d+) tests, (\d+) skipped, (\d+) failures, (\d+) errors, (\d+)s")
+
+# Every header field is a string, or None if the message does not have it.
+# results_kernel is the kernel named by the selftests results path.
+CommitHeader = namedtuple('CommitHeader', list(HEADER_KEYS.values()) + ['results_kernel'])
+
+# header is a CommitHeader. sections is a list of the fstests profile
+# sections, each a list of lines starting with the profile line, as in
+#   xfs_crc: 1000 tests, 2 failures, 100 skipped, 3600 seconds
+#     Failures: generic/001 generic/002
+# totals is the "Totals: ..." line, or None.
+CommitMessage = namedtuple('CommitMessage', ['header', 'sections', 'totals'])
+
+
+def is_profile_name(name):
+    """
+    Check whether name is an fstests profile name, that is a word with an
+    underscore somewhere in its middle like xfs_reflink_4k.
+    """
+    return '_' in name[1:-1] and name.replace('_', 'a').isalnum()
+
+
+def get_profile_name(line):
+    """
+    Get the profile name of a "<profile>: N tests, ..." line, or None if the
+    line does not start a profile section.
+    """
+    name, sep, rest = line.partition(': ')
+    if not sep or not is_profile_name(name):
+        return None
+
+    count, sep, rest = rest.partition(' ')
+    if not count.isdigit() or not rest.startswith('tests'):
+        return None
+
+    return name
+
+
+def get_profile_names(message):
+    """
+    Get the names of the profiles of a tokenized commit message, in order.
+    """
+    return [get_profile_name(section[0]) for section in message.sections]
+
+
+def tokenize_commit_message(log):
+    """
+    Walk a commit message once and split it into its header fields, its
+    fstests profile sections and its totals line. The first occurrence of
+    each header key wins. A profile section ends at the next profile, the
+    totals line or an empty line.
+    """
+    header = dict.fromkeys(CommitHeader._fields)
+    sections = []
+    totals = None
+    section = None
+
+    for line in log.splitlines():
+        if not line.strip():
+            section = None
+            continue
+
+        if get_profile_name(line):
+            section = [line]
+            sections.append(section)
+            continue
+
+        if line.startswith("Totals: "):
+            section = None
+            if totals is None:
+                totals = line
+            continue
+
+        if section is not None:
+            section.append(line)
+            continue
+
+        key, sep, value = line.strip().partition(':')
+        field = HEADER_KEYS.get(key) if sep else None
+        if field and header[field] is None:
+            value = value.strip()
+            if field in NUMERIC_FIELDS:
+                match = NUMBER_RE.match(value)
+                if not match:
+                    continue
+                value = match.group(0)
+            header[field] = value
+            continue
+
+        if header['results_kernel'] is None and RESULTS_PATH_PREFIX in line:
+            path = line.split(RESULTS_PATH_PREFIX, 1)[1]
+            match = RESULTS_KERNEL_RE.match(path)
+            if match:
+                header['results_kernel'] = match.group(0)
+
+    return CommitMessage(CommitHeader(**header), sections, totals)
+
+
+def parse_profile_section(section):
+    """
+    Parse a profile section of a tokenized commit message into
+    (profile, counts, failures). counts is the tuple (tests, failures,
+    skipped, seconds), or None if the profile line does not have them all.
+    failures lists the tests on the "  Failures:" line and the lines
+    continuing it, it is empty without such a line. Every line is looked
+    at once, so this takes linear time whatever the section holds.
+    """
+    profile_line = section[0]
+    profile = get_profile_name(profile_line)
+
+    match = PROFILE_COUNTS_RE.fullmatch(profile_line, len(profile))
+    counts = tuple(int(count) for count in match.groups()) if match else None
+
+    failures = []
+    in_failures = False
+    for line in section[1:]:
+        if in_failures:
+            failures.extend(line.split())
+        elif line.startswith(FAILURES_PREFIX):
+            in_failures = True
+            failures.extend(line[len(FAILURES_PREFIX):].split())
+
+    return profile, counts, failures
+
+
+def parse_test_profiles(message):
+    """
+    Parse the fstests profiles of a tokenized commit message. Profiles
+    whose profile line lacks any of the counts are left out.
+    """
+    profiles = {}
+
+    for section in message.sections:
+        profile, counts, failures = parse_profile_section(section)
+        if not counts:
+            continue
+
+        test_count, failure_count, skipped_count, duration = counts
+        profiles[profile] = {
+            'test_count': test_count,
+            'failure_count': failure_count,
+            'skipped_count': skipped_count,
+            'duration': duration,
+            'failures': failures
+        }
+
+    return profiles
+
+
+def extract_totals(message, profiles):
+    """
+    Extract or calculate filesystem test totals from the tokenized commit
+    message.
+    """
+    # Extract totals if available
+    totals_match = TOTALS_RE.search(message.totals or "")
+    if totals_match:
+        return {
+            'test_count': int(totals_match.group(1)),
+            'skipped_count': int(totals_match.group(2)),
+            'failure_count': int(totals_match.group(3)),
+            'error_count': int(totals_match.group(4)),
+            'duration': int(totals_match.group(5))
+        }
+    else:
+        # Calculate totals from profiles if not explicitly provided
+        return {
+            'test_count': sum(p['test_count'] for p in profiles.values()),
+            'skipped_count': sum(p['skipped_count'] for p in profiles.values()),
+            'failure_count': sum(p['failure_count'] for p in profiles.values()),
+            'error_count': 0,
+            'duration': sum(p['duration'] for p in profiles.values())
+        }
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+from lib.handlers import find_test_type, get_handler, get_out_of_tree_types
+from lib.commit_message import tokenize_commit_message
+from lib.kernel_version import get_kernel_type, is_vanilla_release, parse_kernel_version
+
+
+def parse_commit_log(commit_id, subject, date, log):
+    """
+    Parses an already retrieved commit and determines the test type.
+    Returns the parsed data or None if not a relevant test commit.
+    """
+    # Skip CI verification commits with "kdevops:" subject prefix 
+    # but containing "CI:" in the subject (these are CI verification commits)
+    if subject.startswith("kdevops:") and "CI:" in subject:
+        print(f"Skipping CI verification commit: {commit_id} ('{subject}')")
+        return None
+
+    # Walk the commit message once, the handlers reuse the result
+    message = tokenize_commit_message(log)
+    header = message.header
+    workflow = (header.workflow or "").lower()
+
+    # Determine test type
+    test_type = None
+    
+    # Check for kdevops bringup/test commits we want to include
+    if subject.startswith("kdevops:") and "CI:" not in subject:
+        # This is a kdevops test we want to track
+        if "fstests" in workflow:
+            test_type = "kdevops"
+        else:
+            return None  # Not a kdevops test workflow we're tracking
+    elif "linux-mm-kpd:" in subject:
+        test_type = "mm"
+        if "selftests" not in workflow:
+            return None  # Not a memory management selftest workflow
+    elif "fstests" in workflow:
+        # This is an fstests workflow commit
+        test_type = "fs"
+    else:
+        # Leave anything else to out of tree handlers
+        test_type = find_test_type(subject, message)
+        if not test_type:
+            return None  # Not an fstests workflow commit
+
+    # Extract kernel version, MM tests may only have it in their results path
+    kernel_version = header.kernel or header.results_kernel or "Unknown"
+
+    # Extract test number if available (useful for kdevops tests)
+    test_number = header.test_number
+
+    # Extract CPU count if available
+    cpu_count = header.cpus or "Unknown"
+    
+    # Parse kernel version to extract base version and commit
+    base_version, commit_hash = parse_kernel_version(kernel_version)
+    
+    # Determine if this is an official tag release
+    is_vanilla = is_vanilla_release(subject, base_version)
+    kernel_type = get_kernel_type(base_version)
+
+    # Build base data structure with common properties
+    data = {
+        'commit': commit_id,
+        'subject': subject,
+        'kernel': kernel_version,
+        'base_version': base_version,
+        'commit_hash': commit_hash,
+        'is_vanilla': is_vanilla,
+        'kernel_type': kernel_type,
+        'cpus': cpu_count,
+        'date': date,
+        'test_type': test_type,
+        'log': log,  # Include the full log for module processing
+        'message': message
+    }
+    
+    # Add test number if available (for kdevops tests)
+    if test_number:
+        data['test_number'] = test_number
+
+    return data
+
+def should_process_with_fs_handler(tree, subject):
+    """
+    Determines if a commit should be processed with fs_handler.py.
+    """
+
+    # Valid trees to process.
+    valid_trees = ["linux", "linux-next", "linux-stable"]
+
+    # Valid subjects
+    valid_subjects = ["linux-xfs-kpd", "linux-ext4-kpd", "linux-btrfs-kpd", "linux-tmpfs-kpd"]
+
+    # kdevops will *always* test fstests, but we don't want those tests
+    # to be counted as valid fstests, those test are simply done to ensure
+    # we can build linux, build fstests, and run at least one test.
+    if subject.startswith("kdevops:") or subject.startswith("kdevops-kpd:"):
+        return False
+
+    # Check if the tree matches one of the valid trees we support
+    if tree not in valid_trees:
+        return True
+
+    # Check if the tree matches one of the valid trees we support
+    if subject not in valid_subjects:
+        return True
+
+    return False
+
+
+# Bump whenever parse_commit_log() or the choice of handler changes. This
+# invalidates all parse cache entries, bumping the PARSER_VERSION of a
+# handler only invalidates the entries of that handler.
+PARSER_VERSION = 3
+
+
+def get_parser_version(test_type):
+    """
+    Get the version stamp for parse cache entries of the given test type.
+    """
+    handler = get_handler(test_type)
+    if handler:
+        return f"{PARSER_VERSION}.{handler.PARSER_VERSION}"
+    # Commits without a handler are parsed again once new handlers show up
+    return "+".join([str(PARSER_VERSION)] + get_out_of_tree_types())
+
+
+def parse_commit_results(commit_id, subject, date, log):
+    """
+    Parse an already retrieved commit and let its handler parse the results.
+    Returns (test_type, data), test_type or data is None if there is nothing
+    to write.
+    """
+    print(f"Parsing commit {commit_id}...")
+    data = parse_commit_log(commit_id, subject, date, log)
+
+    if not data:
+        print(f"Commit {commit_id} is not a relevant test commit. Skipping.")
+        return None, None
+
+    # Determine the tree from the commit log
+    tree = data['message'].header.tree or "unknown"
+
+    test_type = data['test_type']
+    if test_type == 'fs' and not should_process_with_fs_handler(tree, data['subject']):
+        test_type = None
+
+    handler = get_handler(test_type)
+    if not handler:
+        print(f"Unknown or unsupported test type for commit {commit_id}: {data['test_type']}")
+        return None, None
+
+    # The handler may still skip the commit by returning None, test_type is
+    # kept so the parse cache entry carries the version of the handler
+    return test_type, handler.prepare_data(data)
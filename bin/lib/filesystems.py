@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import re
+
+# Filesystems the fstests results can be for. Bump PARSER_VERSION in the fs
+# and kdevops handlers when changing this, so cached commits are classified
+# again.
+FILESYSTEMS = [
+    'bcachefs',
+    'btrfs',
+    'cifs',
+    'exfat',
+    'ext2',
+    'ext3',
+    'ext4',
+    'f2fs',
+    'gfs2',
+    'nfs',
+    'ocfs2',
+    'tmpfs',
+    'udf',
+    'xfs',
+]
+
+# All filesystem names in one pattern, so a text is only scanned once. A
+# name must not be part of a longer word or number, linux-xfs-kpd and
+# xfs_reflink_4k are xfs but xfsprogs is not.
+FILESYSTEM_RE = re.compile(
+    r"(?<![a-z0-9])(" +
+    "|".join(re.escape(name) for name in sorted(FILESYSTEMS, key=len, reverse=True)) +
+    r")(?![a-z0-9])",
+    re.IGNORECASE)
+
+
+def find_filesystem(text):
+    """
+    Get the first filesystem named in text, or None.
+    """
+    match = FILESYSTEM_RE.search(text)
+    return match.group(1).lower() if match else None
+
+
+def determine_filesystem_type(subject, log, profile_names=()):
+    """
+    Determine the filesystem type from the commit subject, which is the most
+    reliable, then from the log content and last from the profile names.
+    Returns None if none of them names a known filesystem.
+    """
+    for text in (subject, log, " ".join(profile_names)):
+        fs_type = find_filesystem(text)
+        if fs_type:
+            return fs_type
+
+    return None
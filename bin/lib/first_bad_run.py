@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import bisect
+from collections import namedtuple
+
+from lib.kernel_version import MAINLINE_SERIES, get_kernel_ref, get_kernel_version_key
+
+# Outcome of the search for the first bad run of a test. good is the last
+# run the test passed in before it started failing, None if it already
+# failed in the oldest run, and bad the first run it failed in. checked counts the runs
+# looked at out of the runs of the profile.
+FirstBadRun = namedtuple('FirstBadRun', ['good', 'bad', 'checked', 'runs'])
+
+
+class RunFailures:
+    """
+    Lazy sequence of whether a test failed in each of a list of runs, so
+    bisect only queries the failures of the runs it looks at.
+    """
+
+    def __init__(self, store, runs, profile, test):
+        self.store = store
+        self.runs = runs
+        self.profile = profile
+        self.test = test
+        self.checked = {}
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __getitem__(self, index):
+        if index not in self.checked:
+            self.checked[index] = bool(self.store.query(
+                "SELECT 1 FROM failures WHERE run_id = ? AND profile = ? AND test = ? LIMIT 1",
+                (self.runs[index]['run_id'], self.profile, self.test)))
+        return self.checked[index]
+
+
+def get_profile_runs(store, profile, filesystem=None, series=MAINLINE_SERIES):
+    """
+    Get the fstests runs of a profile in a kernel series from a results
+    index, ordered by kernel version and then by the time of their commit.
+    """
+    sql = ("SELECT r.run_id, r.kernel, r.date, r.timestamp, r.commit_id AS 'commit' "
+           "FROM profiles p JOIN runs r USING (run_id) WHERE p.profile = ? AND r.test_type = 'fs'")
+    params = [profile]
+    if filesystem:
+        sql += " AND r.filesystem = ?"
+        params.append(filesystem)
+
+    runs = []
+    for run in store.query(sql, params):
+        key = get_kernel_version_key(run['kernel'] or "")
+        if key[0] == series:
+            runs.append((key, run['timestamp'], run['commit'], run))
+    runs.sort(key=lambda r: r[:3])
+    return [run for key, timestamp, commit, run in runs]
+
+
+def find_first_bad_run(store, test, profile, filesystem=None, series=MAINLINE_SERIES):
+    """
+    Find the run in which test started failing in profile, with the runs
+    ordered by kernel version. The runs between the last one, which must
+    fail, and the first one are bisected, as git bisect does, so only a
+    logarithmic number of them are looked at. Returns a FirstBadRun, or None
+    if the test does not fail in the latest run.
+    """
+    runs = get_profile_runs(store, profile, filesystem, series)
+    if not runs:
+        return None
+
+    failures = RunFailures(store, runs, profile, test)
+    last = len(runs) - 1
+    if not failures[last]:
+        return None
+
+    if failures[0]:
+        return FirstBadRun(None, runs[0], len(failures.checked), len(runs))
+
+    # runs[0] passed and runs[last] failed, find the first failing run
+    # between them
+    first_bad = bisect.bisect_left(failures, True, 1, last)
+    return FirstBadRun(runs[first_bad - 1], runs[first_bad], len(failures.checked), len(runs))
+
+
+def get_bisect_refs(result):
+    """
+    Get the (bad, good) kernel refs to start git bisect with in a linux tree,
+    good being None if the test already failed in the oldest run.
+    """
+    bad = get_kernel_ref(result.bad['kernel'])
+    good = get_kernel_ref(result.good['kernel']) if result.good else None
+    return bad, good
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import math
+from collections import namedtuple
+
+# Flakiness of the tests of a filesystem, written to its dashboard directory
+FLAKINESS_FILE = 'flakiness.json'
+
+# z of the two sided 95% confidence interval of the failure probability
+CONFIDENCE_Z = 1.96
+# A test is flaky once its status changed back and forth: a test which
+# started failing and keeps failing only flips once
+FLAKY_MIN_FLIPS = 2
+
+# Flakiness of a test in a profile. flips counts the status changes between
+# consecutive runs of the profile, failure_probability is the share of
+# failed runs and ci_low and ci_high its Wilson score interval.
+FlakinessScore = namedtuple('FlakinessScore', ['runs', 'failures', 'flips', 'flip_rate',
+                                               'failure_probability', 'ci_low', 'ci_high'])
+
+
+def is_flaky(score):
+    """
+    Check whether a score is the one of a flaky test.
+    """
+    return score is not None and score.flips >= FLAKY_MIN_FLIPS
+
+
+def wilson_interval(p, n, z=CONFIDENCE_Z):
+    """
+    Wilson score interval of a probability p estimated from n runs.
+    """
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return center - margin, center + margin
+
+
+def get_failure_history(store, test_type=None, filesystem=None, profile=None):
+    """
+    Get the failure history of every (filesystem, profile) in a results
+    store, as {(filesystem, profile): (runs, {test: [run index]})}. runs
+    counts the runs of the profile, indexed oldest first.
+    """
+    where = []
+    params = []
+    for column, value in (('r.test_type', test_type), ('r.filesystem', filesystem),
+                          ('p.profile', profile)):
+        if value:
+            where.append(f"{column} = ?")
+            params.append(value)
+    where = (" WHERE " + " AND ".join(where)) if where else ""
+
+    # run index of each (run ID, profile) within its group
+    run_index = {}
+    history = {}
+    for row in store.query(
+            "SELECT p.run_id, r.filesystem, p.profile FROM profiles p JOIN runs r USING (run_id)" +
+            where + " ORDER BY r.timestamp, r.commit_id", params):
+        key = (row['filesystem'], row['profile'])
+        runs, tests = history.setdefault(key, (0, {}))
+        run_index[(row['run_id'], row['profile'])] = runs
+        history[key] = (runs + 1, tests)
+
+    for row in store.query(
+            "SELECT f.run_id, r.filesystem, f.profile, f.test FROM failures f "
+            "JOIN runs r USING (run_id) JOIN profiles p "
+            "ON p.run_id = f.run_id AND p.profile = f.profile" + where, params):
+        index = run_index.get((row['run_id'], row['profile']))
+        if index is not None:
+            history[(row['filesystem'], row['profile'])][1].setdefault(row['test'], []).append(index)
+
+    return history
+
+
+def score_test(runs, indexes):
+    """
+    Score a test from the sorted, unique indexes of the runs of its profile
+    it failed in. Failures and flips come straight from the indexes: each
+    streak of consecutive failed runs flips the status once when it starts
+    after the first run and once when it ends before the last one.
+    """
+    starts = [b for a, b in zip([-2] + indexes, indexes) if b != a + 1]
+    ends = [a for a, b in zip(indexes, indexes[1:] + [runs + 1]) if b != a + 1]
+
+    failures = len(indexes)
+    flips = sum(start > 0 for start in starts) + sum(end < runs - 1 for end in ends)
+    probability = failures / runs
+    low, high = wilson_interval(probability, runs)
+
+    return FlakinessScore(runs, failures, flips, round(flips / max(runs - 1, 1), 4),
+                          round(probability, 4), round(min(max(low, 0), 1), 4),
+                          round(min(max(high, 0), 1), 4))
+
+
+def score_flakiness(history):
+    """
+    Score every test which failed at least once in a history from
+    get_failure_history(), returns {(filesystem, profile, test): FlakinessScore}.
+    """
+    return {(filesystem, profile, test): score_test(runs, sorted(set(indexes)))
+            for (filesystem, profile), (runs, tests) in history.items()
+            for test, indexes in tests.items()}
+
+
+def get_flakiness_rows(scores, filesystem=None):
+    """
+    Get the scores of a filesystem as rows for JSON output, the flakiest
+    tests first.
+    """
+    rows = [dict(score._asdict(), profile=profile, test=test, flaky=is_flaky(score))
+            for (fs, profile, test), score in scores.items()
+            if filesystem is None or fs == filesystem]
+    rows.sort(key=lambda r: (-r['flip_rate'], -r['failure_probability'], r['profile'], r['test']))
+    return rows
@@ -2,129 +2,39 @@
 # SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
 
 import os
-import re
-import json
 import shutil
-from lib.fs_templates import create_html_template, create_index_template
+from lib.fs_templates import HTML_TEMPLATE, INDEX_TEMPLATE, RUN_HTML_TEMPLATE, RUN_JS
+from lib.template_segments import render_template
+from lib.run_shell import get_run_url, load_run_index_rows, write_run_shell
+from lib.index_accumulator import IndexAccumulator
+from lib.output_writer import OutputWriter, format_json
+from lib.commit_message import (extract_totals, get_profile_names, parse_test_profiles,
+                                tokenize_commit_message)
+from lib.filesystems import determine_filesystem_type
+from lib.run_names import is_newer_run, load_run_data
 
-def determine_filesystem_type(subject, log):
-    """
-    Determine the filesystem type from the commit subject or log content.
-    """
-    # Common filesystem identifiers
-    fs_patterns = {
-        'ext4': [r'ext4', r'linux-ext4'],
-        'btrfs': [r'btrfs', r'linux-btrfs'],
-        'xfs': [r'xfs', r'linux-xfs'],
-        # Add more filesystems as needed
-    }
-    
-    # Check in subject first (more reliable)
-    for fs, patterns in fs_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, subject, re.IGNORECASE):
-                return fs
-    
-    # Try to find in log content if not found in subject
-    for fs, patterns in fs_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, log, re.IGNORECASE):
-                return fs
-    
-    # Try to determine from profile names (last resort)
-    profile_match = re.search(r"^((?:\w+_)+\w+): \d+ tests", log, re.MULTILINE)
-    if profile_match:
-        profile_name = profile_match.group(1).lower()
-        for fs in fs_patterns.keys():
-            if fs in profile_name:
-                return fs
-    
-    return None
+# Bump whenever the parsing done by prepare_data() changes, this invalidates
+# the parse cache entries of this handler
+PARSER_VERSION = 4
 
 
-def parse_test_profiles(log):
-    """
-    Parse filesystem test profiles from the log.
-    """
-    profiles = {}
-
-    # Find all profile sections
-    profile_pattern = r"^((?:\w+_)+\w+): (\d+) tests, (\d+) failures, (\d+) skipped, (\d+) seconds\n(?:.*?\n)*?  Failures:(.*?)(?=\n(?:\w+_)+\w+: |\nTotals: |\n\n|\Z)"
-    profile_sections = re.finditer(profile_pattern, log, re.MULTILINE | re.DOTALL)
-
-    for match in profile_sections:
-        profile = match.group(1)
-        test_count = int(match.group(2))
-        failure_count = int(match.group(3))
-        skipped_count = int(match.group(4))
-        duration = int(match.group(5))
-        
-        # Extract all failures, handling multi-line lists
-        failures_text = match.group(6).strip()
-        # Split by whitespace and filter out empty strings
-        failures = [f for f in re.split(r'\s+', failures_text) if f]
-        
-        profiles[profile] = {
-            'test_count': test_count,
-            'failure_count': failure_count,
-            'skipped_count': skipped_count,
-            'duration': duration,
-            'failures': failures
-        }
-        
-    return profiles
-
-
-def extract_totals(log, profiles):
-    """
-    Extract or calculate filesystem test totals from the log.
-    """
-    # Extract totals if available
-    totals_match = re.search(r"Totals: (\d+) tests, (\d+) skipped, (\d+) failures, (\d+) errors, (\d+)s", log)
-    if totals_match:
-        return {
-            'test_count': int(totals_match.group(1)),
-            'skipped_count': int(totals_match.group(2)),
-            'failure_count': int(totals_match.group(3)),
-            'error_count': int(totals_match.group(4)),
-            'duration': int(totals_match.group(5))
-        }
-    else:
-        # Calculate totals from profiles if not explicitly provided
-        return {
-            'test_count': sum(p['test_count'] for p in profiles.values()),
-            'skipped_count': sum(p['skipped_count'] for p in profiles.values()),
-            'failure_count': sum(p['failure_count'] for p in profiles.values()),
-            'error_count': 0,
-            'duration': sum(p['duration'] for p in profiles.values())
-        }
-
-
-def update_index_page(fs_dir, results):
+def update_index_page(fs_dir, results, writer):
     """
     Update the index page for a filesystem directory with provided results.
     """
-    # Get the index template
-    template_html = create_index_template()
-    
     # Get filesystem name from directory name
     fs_name = os.path.basename(fs_dir)
     
-    # Replace filesystem placeholder
-    template_html = template_html.replace("FILESYSTEM", fs_name)
-    
-    # Replace placeholder with actual data
-    index_html = template_html.replace(
-        "const testResults = RESULTS_PLACEHOLDER;", 
-        f"const testResults = {json.dumps(results, indent=4)};"
-    )
+    # Fill in the filesystem and the actual data
+    index_html = render_template(INDEX_TEMPLATE, {
+        'FILESYSTEM': fs_name,
+        'RESULTS_PLACEHOLDER': format_json(results, 4, writer.compact),
+    })
     
     # Write the index.html
     index_path = os.path.join(fs_dir, 'index.html')
-    with open(index_path, 'w') as f:
-        f.write(index_html)
-    
-    print(f"Index HTML updated at {index_path}")
+    if writer.write(index_path, index_html):
+        print(f"Index HTML updated at {index_path}")
 
 
 def get_html_filename(data):
@@ -154,25 +64,28 @@ def get_html_filename(data):
     return f"{data['kernel']}.html"
 
 
-def process_data(data, output_dir):
+def prepare_data(data):
     """
-    Process filesystem test data and generate dashboard files.
-    This is the main entry point for the fs_handler module.
+    Parse the filesystem test results out of the commit log. This only
+    depends on the commit itself, so it is safe to run in a worker process.
+    Returns None if the commit is for a filesystem we do not know.
     """
-    # Get log content
+    # Get log content and its tokens, parse_commit_log() already has them
     log = data.get('log', '')
+    message = data.pop('message', None) or tokenize_commit_message(log)
     
     # Extract filesystem type
-    fs_type = determine_filesystem_type(data['subject'], log)
+    fs_type = determine_filesystem_type(data['subject'], log, get_profile_names(message))
     if not fs_type:
-        print(f"Warning: Could not determine filesystem type for commit {data['commit']}")
-        fs_type = "unknown"
+        print(f"Warning: Unknown filesystem in commit {data['commit']} ('{data['subject']}'), "
+              "add it to lib/filesystems.py. Skipping.")
+        return None
     
     # Parse test profiles
-    profiles = parse_test_profiles(log)
+    profiles = parse_test_profiles(message)
     
     # Extract totals
-    totals = extract_totals(log, profiles)
+    totals = extract_totals(message, profiles)
     
     # Add filesystem-specific data to the common data structure
     data['filesystem'] = fs_type
@@ -182,94 +95,132 @@ def process_data(data, output_dir):
     # Remove the full log from data before saving to JSON (to reduce file size)
     if 'log' in data:
         del data['log']
-    
-    # Create filesystem-specific directory within output directory
-    fs_dir = os.path.join(output_dir, fs_type)
-    os.makedirs(fs_dir, exist_ok=True)
-    
-    # Generate the HTML filename
-    base_html_filename = get_html_filename(data)
-    base_file_path = os.path.join(fs_dir, base_html_filename)
-    
-    # Get current commit's short ID
-    current_commit_id = data['commit'][:8]
-    
-    # Create a filename with the current commit ID included
-    base_name = base_html_filename.replace('.html', '')
-    commit_html_filename = f"{base_name}-{current_commit_id}.html"
-    commit_file_path = os.path.join(fs_dir, commit_html_filename)
-    
-    # Check if the base file already exists
-    if os.path.exists(base_file_path):
-        # Use the commit ID version for the current (newer) file
-        html_path = commit_file_path
-        json_path = os.path.join(fs_dir, commit_html_filename.replace('.html', '.json'))
-        
-        print(f"Base file exists - using {commit_html_filename} for current commit")
-    else:
-        # Use the base filename for the current file (first one to use this kernel version)
-        html_path = base_file_path
-        json_path = os.path.join(fs_dir, base_html_filename.replace('.html', '.json'))
-        
-        print(f"Base file does not exist - using {base_html_filename} for current commit")
-    
-    # Write the JSON data
-    with open(json_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    print(f"JSON data written to {json_path}")
-    
-    # Create HTML file
-    template_html = create_html_template()
-    template_html = template_html.replace("FILESYSTEM_TYPE", fs_type)
-    dashboard_html = template_html.replace(
-        "const testData = DATA_PLACEHOLDER;",
-        f"const testData = {json.dumps(data, indent=4)};"
-    )
-    
-    with open(html_path, 'w') as f:
-        f.write(dashboard_html)
-    
-    print(f"Dashboard HTML written to {html_path}")
-    
-    # Add the current file data for the index
-    current_result = {
-        'url': os.path.basename(html_path),
-        'display_name': os.path.basename(html_path).replace('.html', ''),
+
+    return data
+
+
+def render_data(data, compact=False):
+    """
+    Render the JSON data file and the JSON payload of the dashboard HTML
+    for prepared data, minified if compact is set.
+    """
+    return format_json(data, 2, compact), format_json(data, 4, compact)
+
+
+def get_index_row(html_file, data):
+    """
+    Build the index row of a run from its HTML file name and data.
+    """
+    return {
+        'url': html_file,
+        'display_name': html_file.replace('.html', ''),
         'type': data.get('kernel_type', 'development'),
         'date': data.get('date', ''),
         'failure_count': data.get('totals', {}).get('failure_count', 0)
     }
+
+
+def load_index_rows(fs_dir, shell=False):
+    """
+    Load the index rows of the runs already written to a filesystem directory.
+    """
+    return load_run_index_rows(fs_dir, get_index_row, shell)
+
+
+def write_run(data, fs_dir, html_filename, index, writer, rendered=None):
+    """
+    Write the dashboard files of a run under html_filename and its JSON
+    counterpart, and add the run to the index.
+    """
+    if rendered is None:
+        rendered = render_data(data, writer.compact)
+    json_data, html_data = rendered
+    fs_type = data['filesystem']
+
+    html_path = os.path.join(fs_dir, html_filename)
+    json_path = os.path.join(fs_dir, html_filename.replace('.html', '.json'))
+
+    # Write the JSON data
+    if writer.write(json_path, json_data):
+        print(f"JSON data written to {json_path}")
     
-    # Collect all HTML files for the index (except index.html itself)
-    html_files = [f for f in os.listdir(fs_dir) 
-                 if f.endswith('.html') and f != 'index.html' 
-                 and f != os.path.basename(html_path)]
+    index_row = get_index_row(html_filename, data)
+
+    if writer.shell:
+        # The shared run.html fetches the JSON data of the run
+        write_run_shell(fs_dir, RUN_HTML_TEMPLATE, RUN_JS, writer, {'FILESYSTEM_TYPE': fs_type})
+        index_row['url'] = get_run_url(index_row['display_name'])
+    else:
+        # Create HTML file
+        dashboard_html = render_template(HTML_TEMPLATE, {
+            'FILESYSTEM_TYPE': fs_type,
+            'DATA_PLACEHOLDER': html_data,
+        })
+        if writer.write(html_path, dashboard_html):
+            print(f"Dashboard HTML written to {html_path}")
     
-    all_results = [current_result]  # Start with current result
+    # Add the current file to the index
+    index.add(fs_dir, index_row, load_index_rows, update_index_page, data)
     
-    # Add all other HTML files
-    for html_file in html_files:
-        # Find the corresponding JSON file
-        json_file = html_file.replace('.html', '.json')
-        file_json_path = os.path.join(fs_dir, json_file)
-        
-        if os.path.exists(file_json_path):
-            try:
-                with open(file_json_path, 'r') as f:
-                    file_data = json.load(f)
-                
-                # Add to results
-                all_results.append({
-                    'url': html_file,
-                    'display_name': html_file.replace('.html', ''),
-                    'type': file_data.get('kernel_type', 'development'),
-                    'date': file_data.get('date', ''),
-                    'failure_count': file_data.get('totals', {}).get('failure_count', 0)
-                })
-            except Exception as e:
-                print(f"Error processing {file_json_path}: {e}")
+    return html_path
+
+
+def get_commit_html_filename(base_html_filename, data):
+    """
+    Get the file name of a run which is not the newest of its kernel, the
+    base file name with the short commit ID appended.
+    """
+    base_name = base_html_filename.replace('.html', '')
+    return f"{base_name}-{data['commit'][:8]}.html"
+
+
+def write_data(data, output_dir, index, writer, rendered=None):
+    """
+    Write the dashboard files for prepared data and add the run to the index.
+    The newest run of a kernel gets the base file name and the others one
+    with their commit ID appended, see lib/run_names.py. A newer run takes
+    the base file name over, moving the run which held it. The index page
+    itself is only written when the index accumulator is flushed.
+    """
+    fs_type = data['filesystem']
+
+    # Create filesystem-specific directory within output directory
+    fs_dir = os.path.join(output_dir, fs_type)
+    os.makedirs(fs_dir, exist_ok=True)
     
-    # Update the index page
-    update_index_page(fs_dir, all_results)
+    # Generate the HTML filename
+    base_html_filename = get_html_filename(data)
     
+    # The JSON of the run holding the base name is written in every mode
+    owner = load_run_data(os.path.join(fs_dir, base_html_filename.replace('.html', '.json')))
+
+    if owner and owner.get('commit') != data['commit'] and not is_newer_run(data, owner):
+        html_filename = get_commit_html_filename(base_html_filename, data)
+        print(f"Base file holds a newer run - using {html_filename} for current commit")
+    else:
+        if owner and owner.get('commit') != data['commit']:
+            # Move the older run holding the base name to its commit name
+            owner_html_filename = get_commit_html_filename(base_html_filename, owner)
+            write_run(owner, fs_dir, owner_html_filename, index, writer)
+            print(f"Moved the older run {owner['commit'][:8]} to {owner_html_filename}")
+        html_filename = base_html_filename
+        print(f"Using {base_html_filename} for current commit")
+
+    return write_run(data, fs_dir, html_filename, index, writer, rendered)
+
+
+def process_data(data, output_dir):
+    """
+    Process filesystem test data and generate dashboard files.
+    This is the main entry point for the fs_handler module.
+    """
+    data = prepare_data(data)
+    if data is None:
+        return None
+
+    writer = OutputWriter(output_dir)
+    index = IndexAccumulator(writer)
+    html_path = write_data(data, output_dir, index, writer)
+    index.flush()
+    writer.close()
     return html_path
@@ -1,6 +1,10 @@
 #!/usr/bin/python3
 # SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
 
+from lib.template_segments import compile_template
+from lib.run_shell import compile_run_shell
+from lib.static_assets import link_assets
+
 def create_html_template():
     """
     Generate the HTML dashboard template for filesystem tests.
@@ -745,6 +749,21 @@ def create_index_template():
             border-color: var(--dev-color);
         }
         
+        .flaky-panel .panel-title {
+            border-color: var(--next-color);
+        }
+
+        .flaky-panel table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+
+        .flaky-panel th, .flaky-panel td {
+            padding: 6px 10px;
+            border-bottom: 1px solid #eee;
+            text-align: left;
+        }
+
         .result-link {
             display: block;
             padding: 10px;
@@ -926,6 +945,24 @@ def create_index_template():
                 </div>
             </div>
         </div>
+
+        <!-- Flaky Tests Panel, filled from flakiness.json -->
+        <div class="panel flaky-panel" id="flaky-panel" style="display: none;">
+            <div class="panel-title">Flaky Tests</div>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Test</th>
+                        <th>Profile</th>
+                        <th>Runs</th>
+                        <th>Failures</th>
+                        <th>Status changes</th>
+                        <th>Failure probability (95% CI)</th>
+                    </tr>
+                </thead>
+                <tbody id="flaky-tests"></tbody>
+            </table>
+        </div>
         
         <div class="footer">
             <p>kdevops: Linux Kernel Test Automation</p>
@@ -990,11 +1027,49 @@ def create_index_template():
             createLinks('dev-releases', devResults, 'dev-link');
         }
         
+        // Show the flaky tests scored from the run history, if any
+        function loadFlakiness() {
+            fetch('flakiness.json')
+                .then(response => response.ok ? response.json() : [])
+                .then(rows => {
+                    const flaky = rows.filter(r => r.flaky);
+                    if (flaky.length === 0) {
+                        return;
+                    }
+
+                    const percent = p => (p * 100).toFixed(1) + '%';
+                    const body = document.getElementById('flaky-tests');
+                    flaky.forEach(r => {
+                        const row = document.createElement('tr');
+                        [r.test, r.profile, r.runs, r.failures, r.flips,
+                         `${percent(r.failure_probability)} (${percent(r.ci_low)} - ${percent(r.ci_high)})`
+                        ].forEach(value => {
+                            const cell = document.createElement('td');
+                            cell.textContent = value;
+                            row.appendChild(cell);
+                        });
+                        body.appendChild(row);
+                    });
+                    document.getElementById('flaky-panel').style.display = 'block';
+                })
+                .catch(() => {});
+        }
+        
         // Initialize the index page
         document.addEventListener('DOMContentLoaded', function() {
             initIndex(testResults);
+            loadFlakiness();
         });
     </script>
 </body>
 </html>
 """
+
+
+# Templates split at their placeholders once, pages are streamed from these
+# with render_template() instead of copying the whole template per page.
+# Pages live one level below the static asset directory.
+HTML_TEMPLATE = compile_template(link_assets(create_html_template(), "../"), ["FILESYSTEM_TYPE", "DATA_PLACEHOLDER"])
+INDEX_TEMPLATE = compile_template(link_assets(create_index_template(), "../"), ["FILESYSTEM", "RESULTS_PLACEHOLDER"])
+# Shared run.html and run.js used instead of per-run pages by --shell
+RUN_HTML_TEMPLATE, RUN_JS = compile_run_shell(link_assets(create_html_template(), "../"), ["FILESYSTEM_TYPE"])
@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+
+def format_git_date(timestamp, tz_offset):
+    """
+    Format an author timestamp and its "+HHMM" offset the way git's %ai does,
+    for example "2025-04-15 10:21:07 +0200".
+    """
+    sign = -1 if tz_offset.startswith('-') else 1
+    minutes = int(tz_offset[1:3]) * 60 + int(tz_offset[3:5])
+    tz = timezone(sign * timedelta(minutes=minutes))
+    date = datetime.fromtimestamp(int(timestamp), tz)
+    return f"{date.strftime('%Y-%m-%d %H:%M:%S')} {tz_offset}"
+
+
+def parse_git_date(date):
+    """
+    Get the Unix timestamp of a date formatted the way git's %ai does, or 0
+    if it cannot be parsed, such as the "Unknown" date of a missing commit.
+    Unlike the date strings, timestamps order dates from different time
+    zones correctly.
+    """
+    try:
+        return int(datetime.strptime(date, '%Y-%m-%d %H:%M:%S %z').timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_commit_object(commit_id, raw):
+    """
+    Split a raw commit object as printed by "git cat-file" into the fields
+    the dashboard tools use. The returned log matches the output of
+    "git show --no-patch --format=%B".
+    """
+    headers, _, message = raw.partition(b"\n\n")
+    date = "Unknown"
+    for line in headers.split(b"\n"):
+        if line.startswith(b"author "):
+            # author Name <email> 1744705267 +0200
+            fields = line.rsplit(b" ", 2)
+            date = format_git_date(fields[1].decode(), fields[2].decode())
+            break
+
+    message = message.decode('utf-8', errors='replace')
+
+    # The subject is the first paragraph folded into a single line, as %s
+    subject = " ".join(line.strip() for line in
+                       message.lstrip("\n").split("\n\n", 1)[0].splitlines())
+
+    return {
+        'commit': commit_id,
+        'subject': subject.strip(),
+        'date': date,
+        'log': message + "\n",
+    }
+
+
+class CommitReader:
+    """
+    Serves commit messages, subjects and dates from a single long-lived
+    "git cat-file --batch" process, so looking up an arbitrary commit costs
+    one pipe round trip instead of spawning git.
+    """
+
+    def __init__(self, cwd=None):
+        self.cwd = cwd
+        self.process = None
+        self.commits = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Terminate the git cat-file process if it was started.
+        """
+        if self.process:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=self.cwd
+        )
+
+    def read(self, commit_id):
+        """
+        Returns a dict with the commit, subject, date and log of the given
+        commit ID or None if it does not name a commit.
+        """
+        if commit_id in self.commits:
+            return self.commits[commit_id]
+
+        if not self.process:
+            self._start()
+
+        # Peel tags and other names down to the commit they point to
+        self.process.stdin.write(f"{commit_id}^{{commit}}\n".encode())
+        self.process.stdin.flush()
+
+        header = self.process.stdout.readline().split()
+        if len(header) != 3 or header[1] != b"commit":
+            self.commits[commit_id] = None
+            return None
+
+        size = int(header[2])
+        raw = self.process.stdout.read(size)
+        # Every object is followed by a newline
+        self.process.stdout.read(1)
+
+        commit = parse_commit_object(header[0].decode(), raw)
+        self.commits[commit_id] = commit
+        return commit
+
+    def get_message(self, commit_id):
+        """
+        Gets the full commit message for a given commit ID.
+        """
+        commit = self.read(commit_id)
+        return commit['log'] if commit else None
+
+    def get_subject(self, commit_id):
+        """
+        Gets the commit subject line for a given commit ID.
+        """
+        commit = self.read(commit_id)
+        return commit['subject'] if commit else "Unknown"
+
+    def get_date(self, commit_id):
+        """
+        Gets the author date for a given commit ID.
+        """
+        commit = self.read(commit_id)
+        return commit['date'] if commit else "Unknown"
+
+
+def iter_commit_records(start_commit, end_commit, commit_ids=None):
+    """
+    Retrieves every commit in start_commit..end_commit with a single git log
+    stream and yields (commit_id, subject, date, log) tuples in git log order.
+    If commit_ids is given only those commits are retrieved, still with a
+    single git log, in the given order.
+    The log matches what "git show --no-patch --format=%B" would return.
+    """
+    if commit_ids is None:
+        result = subprocess.run(
+            ["git", "log", "-z", "--format=%H%x00%s%x00%ai%x00%B",
+             f"{start_commit}..{end_commit}"],
+            capture_output=True, text=True
+        )
+    else:
+        result = subprocess.run(
+            ["git", "log", "-z", "--format=%H%x00%s%x00%ai%x00%B", "--no-walk=unsorted",
+             "--stdin"],
+            input="".join(f"{commit_id}\n" for commit_id in commit_ids),
+            capture_output=True, text=True
+        )
+
+    if result.returncode != 0:
+        print(f"Error: Failed to retrieve commit range {start_commit}..{end_commit}")
+        sys.exit(1)
+
+    # Each commit is terminated by a NUL and so is each of its fields
+    fields = result.stdout.split('\0')
+    for i in range(0, len(fields) - 3, 4):
+        commit_id, subject, date, body = fields[i:i + 4]
+        yield commit_id, subject.strip(), date.strip(), body + "\n"
+
+
+def list_commits(start_commit, end_commit):
+    """
+    Get the IDs of the commits in start_commit..end_commit in git log order.
+    """
+    result = subprocess.run(
+        ["git", "rev-list", f"{start_commit}..{end_commit}"],
+        capture_output=True, text=True
+    )
+
+    if result.returncode != 0:
+        print(f"Error: Failed to retrieve commit range {start_commit}..{end_commit}")
+        sys.exit(1)
+
+    return result.stdout.split()
+
+
+def is_ancestor(ancestor, commit):
+    """
+    Check whether ancestor is reachable from commit.
+    """
+    result = subprocess.run(
+        ["git", "merge-base", "--is-ancestor", ancestor, commit],
+        capture_output=True
+    )
+    return result.returncode == 0
+
+
+def get_root_commit(commit_id):
+    """
+    Gets the root commit of the history leading to commit_id.
+    """
+    result = subprocess.run(
+        ["git", "rev-list", "--max-parents=0", commit_id], capture_output=True, text=True
+    )
+
+    if result.returncode != 0 or not result.stdout.strip():
+        print(f"Error: Failed to find the root commit of {commit_id}")
+        sys.exit(1)
+
+    return result.stdout.split()[0]
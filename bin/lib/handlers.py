@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import importlib
+
+# Module of the handler for each test type. A handler module provides:
+#   PARSER_VERSION, bumped whenever prepare_data() parses differently
+#   prepare_data(data), returning the data to write or None to skip it
+#   render_data(data, compact=False)
+#   write_data(data, output_dir, index, writer, rendered=None)
+#   process_data(data, output_dir)
+# Handlers and their templates are only imported once a commit needs them.
+HANDLER_MODULES = {
+    'fs': 'lib.fs_handler',
+    'mm': 'lib.mm_handler',
+    'kdevops': 'lib.kdevops_handler',
+}
+
+# Out of tree handlers register under this entry point group, named after
+# their test type, for example in their pyproject.toml:
+#   [project.entry-points."kdevops_results_archive.handlers"]
+#   blktests = "kdevops_blktests.handler"
+# Besides the functions above they provide claims_commit(subject, message),
+# which is asked about commits no built in handler takes, message being
+# the tokenized commit message.
+ENTRY_POINT_GROUP = 'kdevops_results_archive.handlers'
+
+# test type -> imported handler module, or None if there is none
+_handlers = {}
+# test type -> entry point of the out of tree handlers, looked up on first use
+_entry_points = None
+
+
+def get_entry_points():
+    """
+    Get the handler entry points of the installed packages by test type.
+    """
+    global _entry_points
+    if _entry_points is None:
+        # Slow to import, only pay for it when needed
+        import importlib.metadata
+        _entry_points = {ep.name: ep for ep in
+                         importlib.metadata.entry_points(group=ENTRY_POINT_GROUP)}
+    return _entry_points
+
+
+def get_handler(test_type):
+    """
+    Get the handler module for a test type, importing it on first use, or
+    None if no handler is known for it.
+    """
+    if test_type in _handlers:
+        return _handlers[test_type]
+
+    handler = None
+    if test_type in HANDLER_MODULES:
+        handler = importlib.import_module(HANDLER_MODULES[test_type])
+    elif test_type:
+        entry_point = get_entry_points().get(test_type)
+        if entry_point:
+            try:
+                handler = entry_point.load()
+            except Exception as e:
+                print(f"Error loading the {test_type} handler {entry_point.value}: {e}")
+
+    _handlers[test_type] = handler
+    return handler
+
+
+def get_out_of_tree_types():
+    """
+    Get the test types registered by out of tree handlers, sorted.
+    """
+    return sorted(name for name in get_entry_points() if name not in HANDLER_MODULES)
+
+
+def find_test_type(subject, message):
+    """
+    Find an out of tree handler claiming a commit, returns its test type or
+    None.
+    """
+    for test_type in get_out_of_tree_types():
+        claims_commit = getattr(get_handler(test_type), 'claims_commit', None)
+        if claims_commit and claims_commit(subject, message):
+            return test_type
+    return None
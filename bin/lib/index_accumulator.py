@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import json
+
+from lib.output_writer import format_json
+
+# Without a results store every index directory keeps its index rows here,
+# so adding a run does not require reading back the JSON of every other run
+# in the directory. With a store, gen-dashboard.py only reads the manifests
+# left by dashboards written before the store existed, to import their runs
+# once, and removes them as their directories are updated.
+MANIFEST_FILE = 'manifest.json'
+
+
+def load_manifest(index_dir):
+    """
+    Load the index rows from the manifest of a directory, or None if the
+    directory has no usable manifest.
+    """
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)['rows']
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error processing {manifest_path}: {e}")
+        return None
+
+
+def write_manifest(index_dir, rows, writer):
+    """
+    Write the index rows of a directory to its manifest.
+    """
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    writer.write(manifest_path, format_json({'rows': rows}, 2, writer.compact))
+
+
+def load_existing_rows(index_dir, load_index_rows, shell=False):
+    """
+    Load the rows of the runs written to index_dir by earlier invocations
+    from its manifest. Directories written before manifests existed are
+    scanned once with load_index_rows(index_dir, shell) instead, shell
+    being set if the runs were written for the shared run.html.
+    """
+    existing_rows = load_manifest(index_dir)
+    if existing_rows is None:
+        existing_rows = load_index_rows(index_dir, shell)
+    return existing_rows
+
+
+class IndexAccumulator:
+    """
+    Collects the index rows of every subsystem directory touched during a run,
+    so each subsystem index.html is rendered once at the end of the run
+    instead of being rebuilt from a directory scan for every commit.
+    With a results store the rows are kept in and rendered from the store
+    alone, otherwise in the manifest of each directory.
+    """
+
+    def __init__(self, writer, store=None):
+        self.writer = writer
+        self.store = store
+        # index directory -> (update_index_page, {display_name: row}), the
+        # rows being None when they are kept in the store
+        self.indexes = {}
+
+    def add(self, index_dir, row, load_index_rows, update_index_page, data=None):
+        """
+        Add or replace the row of the run row['display_name'] in the index
+        of index_dir. data is the data the handler prepared for the run, the
+        store keeps its details.
+        Without a store, the first time a directory is seen its existing rows
+        are loaded, so runs written by earlier invocations stay listed.
+        update_index_page(index_dir, rows, writer) renders the index.
+        """
+        if self.store:
+            rel_dir = os.path.relpath(index_dir, self.writer.output_dir)
+            self.store.add_run(rel_dir, row, data)
+            self.indexes[index_dir] = (update_index_page, None)
+            return
+
+        if index_dir not in self.indexes:
+            existing_rows = load_existing_rows(index_dir, load_index_rows, self.writer.shell)
+            rows = {r['display_name']: r for r in existing_rows}
+            self.indexes[index_dir] = (update_index_page, rows)
+
+        self.indexes[index_dir][1][row['display_name']] = row
+
+    def flush(self):
+        """
+        Render the index page of every directory touched since the last
+        flush, and without a store write its manifest. Rows are ordered
+        newest first.
+        """
+        for index_dir, (update_index_page, rows) in sorted(self.indexes.items()):
+            if rows is None:
+                rel_dir = os.path.relpath(index_dir, self.writer.output_dir)
+                results = self.store.get_index_rows(rel_dir)
+                # The store is the only source of the rows, drop any manifest
+                # it was imported from
+                self.writer.remove(os.path.join(index_dir, MANIFEST_FILE))
+            else:
+                results = sorted(rows.values(),
+                                 key=lambda r: (r.get('date', ''), r['url']), reverse=True)
+                write_manifest(index_dir, results, self.writer)
+            update_index_page(index_dir, results, self.writer)
+
+        self.indexes = {}
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import lzma
+import time
+import tarfile
+import multiprocessing
+import xml.etree.ElementTree as ET
+from collections import deque
+
+from lib.result_tarball import LfsPointerError, iter_members
+from lib.paths import REPO_DIR
+from lib.xunit import get_member_profile, iter_xunit_rows
+
+# Directories of the archive holding result tarballs
+RESULT_DIRS = ['fstests', 'blktests', 'selftests']
+
+# Bump whenever parse_tarball() records something new, so tarballs are
+# ingested again
+INGEST_VERSION = 2
+
+# Outcome of ingesting a tarball
+INGESTED = 'ingested'
+LFS_POINTER = 'lfs-pointer'
+FAILED = 'failed'
+
+
+def get_tarball_key(path):
+    """
+    Get the key of a tarball in the ingested records: its path relative to
+    the archive when inside it, so records do not depend on the checkout.
+    """
+    path = os.path.abspath(path)
+    if os.path.commonpath([path, REPO_DIR]) == REPO_DIR:
+        return os.path.relpath(path, REPO_DIR)
+    return path
+
+
+def is_record_current(record, path):
+    """
+    Check whether the ingested record of a tarball is still up to date.
+    """
+    return (record is not None and record.get('version') == INGEST_VERSION and
+            record['tarball_size'] == os.path.getsize(path))
+
+
+def parse_tarball(path):
+    """
+    Parse the result members of a tarball in one streaming pass. Tests with
+    a .out.bad file are listed under failures, by their path in the tarball
+    without the suffix, and every test of the xunit result.xml files gets a
+    [test, profile, status, seconds] row under tests.
+    """
+    record = {
+        'members': 0,
+        'uncompressed_size': 0,
+        'failures': [],
+        'tests': [],
+    }
+
+    for member, fileobj in iter_members(path):
+        record['members'] += 1
+        record['uncompressed_size'] += member.size
+        if member.name.endswith('.out.bad'):
+            record['failures'].append(member.name[:-len('.out.bad')])
+        elif os.path.basename(member.name) == 'result.xml':
+            profile = get_member_profile(member.name)
+            record['tests'].extend(list(row) for row in iter_xunit_rows(fileobj, profile))
+
+    record['failures'].sort()
+    return record
+
+
+def ingest_tarball(path):
+    """
+    Decompress and parse a single tarball, returns (status, record, seconds).
+    Never raises so a bad tarball cannot take a worker down. Tarballs which
+    are git lfs pointers get the LFS_POINTER status and a record of None,
+    tarballs which cannot be read get the FAILED status and an
+    {'error': message} record.
+    """
+    start = time.monotonic()
+    try:
+        record = parse_tarball(path)
+        record['path'] = get_tarball_key(path)
+        record['tarball_size'] = os.path.getsize(path)
+        record['version'] = INGEST_VERSION
+        status = INGESTED
+    except LfsPointerError:
+        record = None
+        status = LFS_POINTER
+    except (OSError, EOFError, tarfile.TarError, lzma.LZMAError, ET.ParseError) as e:
+        record = {'error': str(e)}
+        status = FAILED
+
+    return status, record, time.monotonic() - start
+
+
+def ingest_tarballs(paths, jobs=1, queue_size=None):
+    """
+    Ingest tarballs in a pool of jobs processes, yielding
+    (path, status, record, seconds) in the order of paths. At most
+    queue_size tarballs, twice the jobs by default, are queued at once, so
+    paths can be a lazy walk of the whole archive.
+    """
+    if jobs <= 1:
+        for path in paths:
+            yield (path,) + ingest_tarball(path)
+        return
+
+    if queue_size is None:
+        queue_size = jobs * 2
+
+    pending = deque()
+    with multiprocessing.Pool(jobs) as pool:
+        for path in paths:
+            pending.append((path, pool.apply_async(ingest_tarball, (path,))))
+            if len(pending) >= queue_size:
+                path, result = pending.popleft()
+                yield (path,) + result.get()
+
+        while pending:
+            path, result = pending.popleft()
+            yield (path,) + result.get()
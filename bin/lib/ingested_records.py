@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import json
+
+
+def load_records(path):
+    """
+    Load the ingested records by tarball key, an empty dict if there are
+    none yet.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            records[record['path']] = record
+
+    return records
+
+
+def save_records(path, records):
+    """
+    Write the ingested records, one JSON line per tarball, sorted by key.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for key in sorted(records):
+            f.write(json.dumps(records[key], sort_keys=True) + '\n')
+    os.replace(tmp_path, path)
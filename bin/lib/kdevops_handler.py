@@ -2,125 +2,37 @@
 # SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
 
 import os
-import re
-import json
 import shutil
 
 # Import templates
-from lib.kdevops_templates import create_html_template, create_index_template
-
-def determine_filesystem_type(subject, log):
-    """
-    Determine the filesystem type from the commit subject or log content.
-    """
-    # Common filesystem identifiers
-    fs_patterns = {
-        'ext4': [r'ext4', r'linux-ext4'],
-        'btrfs': [r'btrfs', r'linux-btrfs'],
-        'xfs': [r'xfs', r'linux-xfs'],
-        # Add more filesystems as needed
-    }
-    
-    # Check in subject first (more reliable)
-    for fs, patterns in fs_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, subject, re.IGNORECASE):
-                return fs
-    
-    # Try to find in log content if not found in subject
-    for fs, patterns in fs_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, log, re.IGNORECASE):
-                return fs
-    
-    # Try to determine from profile names (last resort)
-    profile_match = re.search(r"^((?:\w+_)+\w+): \d+ tests", log, re.MULTILINE)
-    if profile_match:
-        profile_name = profile_match.group(1).lower()
-        for fs in fs_patterns.keys():
-            if fs in profile_name:
-                return fs
-    
-    return None
-
-
-def parse_fs_test_profiles(log):
-    """
-    Parse filesystem test profiles from the log.
-    """
-    profiles = {}
-
-    # Find all profile sections
-    profile_pattern = r"^((?:\w+_)+\w+): (\d+) tests, (\d+) failures, (\d+) skipped, (\d+) seconds\n(?:.*?\n)*?  Failures:(.*?)(?=\n(?:\w+_)+\w+: |\nTotals: |\n\n|\Z)"
-    profile_sections = re.finditer(profile_pattern, log, re.MULTILINE | re.DOTALL)
-
-    for match in profile_sections:
-        profile = match.group(1)
-        test_count = int(match.group(2))
-        failure_count = int(match.group(3))
-        skipped_count = int(match.group(4))
-        duration = int(match.group(5))
-        
-        # Extract all failures, handling multi-line lists
-        failures_text = match.group(6).strip()
-        # Split by whitespace and filter out empty strings
-        failures = [f for f in re.split(r'\s+', failures_text) if f]
-        
-        profiles[profile] = {
-            'test_count': test_count,
-            'failure_count': failure_count,
-            'skipped_count': skipped_count,
-            'duration': duration,
-            'failures': failures
-        }
-        
-    return profiles
-
-
-def extract_fs_totals(log, profiles):
-    """
-    Extract or calculate filesystem test totals from the log.
-    """
-    # Extract totals if available
-    totals_match = re.search(r"Totals: (\d+) tests, (\d+) skipped, (\d+) failures, (\d+) errors, (\d+)s", log)
-    if totals_match:
-        return {
-            'test_count': int(totals_match.group(1)),
-            'skipped_count': int(totals_match.group(2)),
-            'failure_count': int(totals_match.group(3)),
-            'error_count': int(totals_match.group(4)),
-            'duration': int(totals_match.group(5))
-        }
-    else:
-        # Calculate totals from profiles if not explicitly provided
-        return {
-            'test_count': sum(p['test_count'] for p in profiles.values()),
-            'skipped_count': sum(p['skipped_count'] for p in profiles.values()),
-            'failure_count': sum(p['failure_count'] for p in profiles.values()),
-            'error_count': 0,
-            'duration': sum(p['duration'] for p in profiles.values())
-        }
-
-
-def update_index_page(kdevops_dir, results):
+from lib.kdevops_templates import HTML_TEMPLATE, INDEX_TEMPLATE, RUN_HTML_TEMPLATE, RUN_JS
+from lib.template_segments import render_template
+from lib.run_shell import get_run_url, load_run_index_rows, write_run_shell
+from lib.index_accumulator import IndexAccumulator
+from lib.output_writer import OutputWriter, format_json
+from lib.run_names import is_newer_run, load_run_data
+from lib.commit_message import (extract_totals, get_profile_names, parse_test_profiles,
+                                tokenize_commit_message)
+from lib.filesystems import determine_filesystem_type
+
+# Bump whenever the parsing done by prepare_data() changes, this invalidates
+# the parse cache entries of this handler
+PARSER_VERSION = 4
+
+
+def update_index_page(kdevops_dir, results, writer):
     """
     Update the index page for the kdevops directory with provided results.
     """
-    # Get the index template
-    template_html = create_index_template()
-    
-    # Replace placeholder with actual data
-    index_html = template_html.replace(
-        "const testResults = RESULTS_PLACEHOLDER;", 
-        f"const testResults = {json.dumps(results, indent=4)};"
-    )
+    # Fill in the actual data
+    index_html = render_template(INDEX_TEMPLATE, {
+        'RESULTS_PLACEHOLDER': format_json(results, 4, writer.compact),
+    })
     
     # Write the index.html
     index_path = os.path.join(kdevops_dir, 'index.html')
-    with open(index_path, 'w') as f:
-        f.write(index_html)
-    
-    print(f"Index HTML updated at {index_path}")
+    if writer.write(index_path, index_html):
+        print(f"Index HTML updated at {index_path}")
 
 
 def get_html_filename(data):
@@ -157,33 +69,30 @@ def get_html_filename(data):
     return f"{data['kernel']}.html"
 
 
-def process_data(data, output_dir):
+def prepare_data(data):
     """
-    Process kdevops test data and generate dashboard files.
-    This is the main entry point for the kdevops_handler module.
+    Parse the kdevops test results out of the commit log. This only
+    depends on the commit itself, so it is safe to run in a worker process.
     """
-    # Get log content
+    # Get log content and its tokens, parse_commit_log() already has them
     log = data.get('log', '')
+    message = data.pop('message', None) or tokenize_commit_message(log)
     
     # Extract filesystem type if any
-    fs_type = determine_filesystem_type(data['subject'], log)
+    fs_type = determine_filesystem_type(data['subject'], log, get_profile_names(message))
     
     # Parse test profiles
-    profiles = parse_fs_test_profiles(log)
+    profiles = parse_test_profiles(message)
     
     # Extract totals
-    totals = extract_fs_totals(log, profiles)
+    totals = extract_totals(message, profiles)
     
     # Extract tree and ref
-    tree_match = re.search(r"tree:\s+(.*?)\n", log)
-    tree = tree_match.group(1).strip() if tree_match else "unknown"
-    
-    ref_match = re.search(r"ref:\s+(.*?)\n", log)
-    ref = ref_match.group(1).strip() if ref_match else "unknown"
+    tree = message.header.tree or "unknown"
+    ref = message.header.ref or "unknown"
     
     # Extract test result
-    result_match = re.search(r"test result:\s+(.*?)\n", log)
-    test_result = result_match.group(1).strip() if result_match else "unknown"
+    test_result = message.header.test_result or "unknown"
     
     # Add kdevops-specific data to the common data structure
     data['filesystem'] = fs_type
@@ -196,7 +105,51 @@ def process_data(data, output_dir):
     # Remove the full log from data before saving to JSON (to reduce file size)
     if 'log' in data:
         del data['log']
-    
+
+    return data
+
+
+def render_data(data, compact=False):
+    """
+    Render the JSON data file and the JSON payload of the dashboard HTML
+    for prepared data, minified if compact is set.
+    """
+    return format_json(data, 2, compact), format_json(data, 4, compact)
+
+
+def get_index_row(html_file, data):
+    """
+    Build the index row of a run from its HTML file name and data.
+    """
+    return {
+        'url': html_file,
+        'display_name': html_file.replace('.html', ''),
+        'type': data.get('kernel_type', 'development'),
+        'date': data.get('date', ''),
+        'test_result': data.get('test_result', 'unknown'),
+        'test_number': data.get('test_number', '0'),
+        'failure_count': data.get('totals', {}).get('failure_count', 0)
+    }
+
+
+def load_index_rows(kdevops_dir, shell=False):
+    """
+    Load the index rows of the runs already written to the kdevops directory.
+    """
+    return load_run_index_rows(kdevops_dir, get_index_row, shell)
+
+
+def write_data(data, output_dir, index, writer, rendered=None):
+    """
+    Write the dashboard files for prepared data and add the run to the index.
+    Of the runs sharing a file name only the newest is kept, see
+    lib/run_names.py, returns None if a newer run already holds it. The
+    index page itself is only written when the index accumulator is flushed.
+    """
+    if rendered is None:
+        rendered = render_data(data, writer.compact)
+    json_data, html_data = rendered
+
     # Create directory for kdevops tests
     kdevops_dir = os.path.join(output_dir, 'kdevops')
     os.makedirs(kdevops_dir, exist_ok=True)
@@ -206,81 +159,44 @@ def process_data(data, output_dir):
     
     # Write the JSON data file
     json_path = os.path.join(kdevops_dir, html_filename.replace('.html', '.json'))
+
+    owner = load_run_data(json_path)
+    if owner and owner.get('commit') != data['commit'] and not is_newer_run(data, owner):
+        print(f"{json_path} holds a newer run, skipping commit {data['commit'][:8]}")
+        return None
     
-    # Remove existing file if it exists
-    if os.path.exists(json_path):
-        os.remove(json_path)
-    
-    with open(json_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    print(f"JSON data written to {json_path}")
+    if writer.write(json_path, json_data):
+        print(f"JSON data written to {json_path}")
     
     # Create HTML file path
     html_path = os.path.join(kdevops_dir, html_filename)
     
-    # Remove existing HTML if it exists
-    if os.path.exists(html_path):
-        os.remove(html_path)
-    
-    # Get the HTML template
-    template_html = create_html_template()
-    
-    # Replace placeholder with actual JSON data
-    dashboard_html = template_html.replace(
-        "const testData = DATA_PLACEHOLDER;", 
-        f"const testData = {json.dumps(data, indent=4)};"
-    )
-    
-    # Write the HTML dashboard
-    with open(html_path, 'w') as f:
-        f.write(dashboard_html)
-    
-    print(f"Dashboard HTML written to {html_path}")
-    
-    # Collect data for the index
-    index_result = {
-        'url': html_filename,
-        'display_name': html_filename.replace('.html', ''),
-        'type': data.get('kernel_type', 'development'),
-        'date': data.get('date', ''),
-        'test_result': data.get('test_result', 'unknown'),
-        'test_number': data.get('test_number', '0'),
-        'failure_count': data.get('totals', {}).get('failure_count', 0)
-    }
-    
-    # Find all existing HTML files (except index.html) to compile index
-    all_results = [index_result]  # Start with the current result
-    html_files = [f for f in os.listdir(kdevops_dir) if f.endswith('.html') and f != 'index.html' and f != html_filename]
+    index_row = get_index_row(html_filename, data)
+
+    if writer.shell:
+        # The shared run.html fetches the JSON data of the run
+        write_run_shell(kdevops_dir, RUN_HTML_TEMPLATE, RUN_JS, writer)
+        index_row['url'] = get_run_url(index_row['display_name'])
+    else:
+        # Write the HTML dashboard with the actual JSON data
+        dashboard_html = render_template(HTML_TEMPLATE, {'DATA_PLACEHOLDER': html_data})
+        if writer.write(html_path, dashboard_html):
+            print(f"Dashboard HTML written to {html_path}")
     
-    for html_file in html_files:
-        # Find the corresponding JSON file
-        json_file = html_file.replace('.html', '.json')
-        json_path = os.path.join(kdevops_dir, json_file)
-        
-        if os.path.exists(json_path):
-            try:
-                with open(json_path, 'r') as f:
-                    file_data = json.load(f)
-                
-                # Extract relevant information
-                result = {
-                    'url': html_file,
-                    'display_name': html_file.replace('.html', ''),
-                    'type': file_data.get('kernel_type', 'development'),
-                    'date': file_data.get('date', ''),
-                    'test_result': file_data.get('test_result', 'unknown'),
-                    'test_number': file_data.get('test_number', '0'),
-                    'failure_count': file_data.get('totals', {}).get('failure_count', 0)
-                }
-                
-                all_results.append(result)
-            except Exception as e:
-                print(f"Error processing {json_path}: {e}")
+    # Add the current run to the index
+    index.add(kdevops_dir, index_row, load_index_rows, update_index_page, data)
     
-    # Sort results by date (newest first) before updating index
-    all_results.sort(key=lambda x: x.get('date', ''), reverse=True)
+    return html_path
 
-    # Update the index page
-    update_index_page(kdevops_dir, all_results)
-    
+
+def process_data(data, output_dir):
+    """
+    Process kdevops test data and generate dashboard files.
+    This is the main entry point for the kdevops_handler module.
+    """
+    writer = OutputWriter(output_dir)
+    index = IndexAccumulator(writer)
+    html_path = write_data(prepare_data(data), output_dir, index, writer)
+    index.flush()
+    writer.close()
     return html_path
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import re
+
+# Pattern for standard kernel versions with git hash
+KERNEL_VERSION_RE = re.compile(r'^(\d+\.\d+(?:\.\d+)?(?:-\w+\d+)?(?:-\w+\d+)?)-g([a-f0-9]+)$')
+# Pattern for linux-next tags
+NEXT_VERSION_RE = re.compile(r'^(next-\d+)-g([a-f0-9]+)$')
+# linux-next tag anywhere in a base version, next-20250321 or the
+# 6.14.0-next-20250328 the linux-next tree reports
+NEXT_TAG_RE = re.compile(r'(?:^|-)(next-(\d{8}))(?:-|$)')
+# Subject of an official release tag
+RELEASE_SUBJECT_RE = re.compile(r'Linux \d+\.\d+(?:\.\d+)?(?:-rc\d+)?')
+NUMBER_RE = re.compile(r'\d+')
+
+
+def parse_kernel_version(kernel_version):
+    """
+    Parse kernel version string to extract base version and commit hash.
+    Examples:
+    - 6.15.0-rc2-g57265e6ac675 -> (6.15.0-rc2, 57265e6ac675)
+    - 6.15.0-g57265e6ac675 -> (6.15.0, 57265e6ac675)
+    - next-20250321-g1234abcd -> (next-20250321, 1234abcd)
+    """
+    match = KERNEL_VERSION_RE.match(kernel_version)
+    if match:
+        return match.group(1), match.group(2)
+    
+    match = NEXT_VERSION_RE.match(kernel_version)
+    if match:
+        return match.group(1), match.group(2)
+    
+    # If no pattern matches, return the original and empty hash
+    return kernel_version, ""
+
+
+def is_vanilla_release(subject, base_version):
+    """
+    Determine if this is an official vanilla kernel release.
+    """
+    # Check if subject contains "Linux version" and the base version
+    if "Linux" in subject and base_version in subject:
+        return True
+    
+    # Look for patterns indicating an official release tag
+    if RELEASE_SUBJECT_RE.search(subject):
+        return True
+    
+    return False
+
+
+def get_kernel_type(base_version):
+    """
+    Determine the kernel type based on the base version.
+    Returns one of: 'stable', 'vanilla', 'rc', 'next', 'development'
+    """
+    if NEXT_TAG_RE.search(base_version):
+        return "next"
+    
+    if "-rc" in base_version:
+        return "rc"
+    
+    # Check if it's a stable version (has three version components)
+    version_parts = NUMBER_RE.findall(base_version)
+    if len(version_parts) >= 3 and int(version_parts[2]) > 0:
+        return "stable"
+    
+    # If it has just major.minor or major.minor.0, it's a vanilla release
+    if len(version_parts) >= 2:
+        if len(version_parts) == 2 or int(version_parts[2]) == 0:
+            return "vanilla"
+    
+    # Default to development
+    return "development"
+
+
+# Version numbers at the start of a base version, 6.15.0-rc2 or 6.14.3
+VERSION_NUMBERS_RE = re.compile(r'^(\d+)\.(\d+)(?:\.(\d+))?(?:-rc(\d+))?')
+# Commit hash of a kernel version the patterns above do not parse, such as
+# 6.15.0-rc2-g57265e6ac675-dirty
+LOOSE_HASH_RE = re.compile(r'-g([a-f0-9]{7,})\b')
+
+# Kernel series which can be ordered against each other
+MAINLINE_SERIES = 0
+NEXT_SERIES = 1
+OTHER_SERIES = 2
+
+
+def get_kernel_version_key(kernel_version):
+    """
+    Get a sort key ordering kernel versions by release rather than by the
+    date they were tested: release candidates before their release, and
+    the release before its stable updates. The key starts with the series of
+    the kernel, linux-next by date and anything unparsable by name sort
+    after mainline and stable.
+    """
+    base_version, commit_hash = parse_kernel_version(kernel_version)
+    kernel_type = get_kernel_type(base_version)
+
+    if kernel_type == "next":
+        return (NEXT_SERIES, int(NEXT_TAG_RE.search(base_version).group(2)))
+
+    match = VERSION_NUMBERS_RE.match(base_version)
+    if not match or kernel_type == "development":
+        return (OTHER_SERIES, kernel_version)
+
+    major, minor, patch, rc = match.groups()
+    if rc is not None:
+        return (MAINLINE_SERIES, int(major), int(minor), 0, int(rc))
+    return (MAINLINE_SERIES, int(major), int(minor), 1, int(patch or 0))
+
+
+def get_kernel_ref(kernel_version):
+    """
+    Get what to hand to git in a linux tree for a kernel version: its commit
+    hash, or its release tag when it has none.
+    """
+    base_version, commit_hash = parse_kernel_version(kernel_version)
+    if commit_hash:
+        return commit_hash
+
+    match = LOOSE_HASH_RE.search(kernel_version)
+    if match:
+        return match.group(1)
+
+    if get_kernel_type(base_version) == "next":
+        return NEXT_TAG_RE.search(base_version).group(1)
+
+    match = VERSION_NUMBERS_RE.match(base_version)
+    if match:
+        major, minor, patch, rc = match.groups()
+        tag = f"v{major}.{minor}"
+        if patch and patch != "0":
+            tag += f".{patch}"
+        if rc is not None:
+            tag += f"-rc{rc}"
+        return tag
+
+    return kernel_version
@@ -1,77 +1,112 @@
 #!/usr/bin/python3
 # SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
 
+import io
 import os
 import re
-import json
 import shutil
 
 # Import templates
-from lib.mm_templates import create_html_template, create_index_template
+from lib.mm_templates import HTML_TEMPLATE, INDEX_TEMPLATE, RUN_HTML_TEMPLATE, RUN_JS
+from lib.template_segments import render_template
+from lib.run_shell import get_run_url, load_run_index_rows, write_run_shell
+from lib.index_accumulator import IndexAccumulator
+from lib.output_writer import OutputWriter, format_json
+from lib.run_names import is_newer_run, load_run_data
+
+# Bump whenever the parsing done by prepare_data() changes, this invalidates
+# the parse cache entries of this handler
+PARSER_VERSION = 3
+
+# "N of M tests passed" result lines, with "kernel:" in front of the suite
+# name for results printed by the kernel, as logged by journald or dmesg
+RESULT_RE = re.compile(r"(kernel: )?(\w+): (\d+) of (\d+) tests passed")
+# TAP lines of the selftests, also when nested as "# ok 1 ...", and bare
+# directives without a test name such as "ok 1 # SKIP reason"
+TAP_RE = re.compile(r"^([#\s]*)(not ok|ok) \d+(?:\s+-)?(?:\s+(?!#)(.*?))?(?:\s+#\s*(\w+).*)?$")
+# Header the kselftest runner prints before the TAP output of a suite, as
+# "# selftests: mm: run_vmtests.sh" one level above it
+SUITE_RE = re.compile(r"^([#\s]*)selftests: (.+?)\s*$")
+# Lines the selftests print about a failure
+FAILURE_RE = re.compile(r"\[FAIL\]|\bFAIL\b")
+
 
 def parse_mm_test_results(log):
     """
-    Parse memory management test results from the log.
+    Parse memory management test results from the log in a single pass.
+    Every "N of M tests passed" line counts once, as a kernel result when
+    printed by the kernel and as a userspace one otherwise. The status of
+    each selftest reported in TAP and the failure lines are kept too.
+    Selftests are keyed by the suite they are nested in, '' for the top
+    level, so tests of the same name in different suites are kept apart.
     """
     tests = {
         'kernel': {},
-        'userspace': {}
+        'userspace': {},
+        # suite -> selftest name -> 'pass', 'fail' or 'skip'
+        'selftests': {},
+        'failure_lines': []
     }
+    # (nesting depth, name) of the suites the current line is nested in
+    suites = []
     
-    # Parse kernel test results
-    kernel_pattern = r"(\w+) kernel: (\w+): (\d+) of (\d+) tests passed"
-    kernel_matches = re.finditer(kernel_pattern, log, re.MULTILINE)
-    
-    for match in kernel_matches:
-        test_name = match.group(2).lower()
-        passed = int(match.group(3))
-        total = int(match.group(4))
-        
-        tests['kernel'][test_name] = {
-            'passed': passed,
-            'total': total,
-            'failed': total - passed
-        }
-    
-    # Parse userspace test results
-    userspace_pattern = r"(\w+): (\d+) of (\d+) tests passed"
-    userspace_matches = re.finditer(userspace_pattern, log, re.MULTILINE)
-    
-    for match in userspace_matches:
-        test_name = match.group(1).lower()
-        passed = int(match.group(2))
-        total = int(match.group(3))
-        
-        # Skip duplicates (already found in kernel tests)
-        if test_name not in tests['userspace']:
-            tests['userspace'][test_name] = {
-                'passed': passed,
-                'total': total,
-                'failed': total - passed
-            }
+    for line in io.StringIO(log):
+        line = line.rstrip('\n')
+
+        if "tests passed" in line:
+            match = RESULT_RE.search(line)
+            if match:
+                kind = 'kernel' if match.group(1) else 'userspace'
+                test_name = match.group(2).lower()
+                passed = int(match.group(3))
+                total = int(match.group(4))
+
+                # The first userspace result of a test wins, the last kernel one
+                if kind == 'kernel' or test_name not in tests['userspace']:
+                    tests[kind][test_name] = {
+                        'passed': passed,
+                        'total': total,
+                        'failed': total - passed
+                    }
+                continue
+
+        if "ok " in line:
+            match = TAP_RE.match(line)
+            if match:
+                depth = match.group(1).count('#')
+                status = 'pass' if match.group(2) == 'ok' else 'fail'
+                if match.group(4) and match.group(4).upper() == 'SKIP':
+                    status = 'skip'
+                suite = " / ".join(name for suite_depth, name in suites if suite_depth <= depth)
+                tests['selftests'].setdefault(suite, {})[(match.group(3) or '').strip()] = status
+                continue
+
+        if "selftests: " in line:
+            match = SUITE_RE.match(line)
+            if match:
+                depth = match.group(1).count('#')
+                suites = [suite for suite in suites if suite[0] < depth] + [(depth, match.group(2))]
+                continue
+
+        if "FAIL" in line and FAILURE_RE.search(line):
+            tests['failure_lines'].append(line.strip())
     
     return tests
 
 
-def update_index_page(mm_dir, results):
+def update_index_page(mm_dir, results, writer):
     """
     Update the index page for the memory management directory with provided results.
     """
-    # Get the index template
-    template_html = create_index_template()
-    
-    # Replace placeholder with actual data
-    index_html = template_html.replace(
-        "const testResults = RESULTS_PLACEHOLDER;", 
-        f"const testResults = {json.dumps(results, indent=4)};"
-    )
+    # Fill in the actual data
+    index_html = render_template(INDEX_TEMPLATE, {
+        'RESULTS_PLACEHOLDER': format_json(results, 4, writer.compact),
+    })
     
     # Write the index.html
     index_path = os.path.join(mm_dir, 'index.html')
-    with open(index_path, 'w') as f:
-        f.write(index_html)
-    
-    print(f"Index HTML updated at {index_path}")
+    if writer.write(index_path, index_html):
+        print(f"Index HTML updated at {index_path}")
 
 
 def get_html_filename(data):
@@ -101,13 +136,15 @@ def get_html_filename(data):
     return f"{data['kernel']}.html"
 
 
-def process_data(data, output_dir):
+def prepare_data(data):
     """
-    Process memory management test data and generate dashboard files.
-    This is the main entry point for the mm_handler module.
+    Parse the memory management test results out of the commit log. This only
+    depends on the commit itself, so it is safe to run in a worker process.
     """
-    # Get log content
+    # Get log content, the selftest lines are not part of the tokenized
+    # header and fstests sections
     log = data.get('log', '')
+    data.pop('message', None)
     
     # Parse memory management test results
     tests = parse_mm_test_results(log)
@@ -115,15 +152,58 @@ def process_data(data, output_dir):
     # Add MM-specific data to the common data structure
     data['tests'] = tests
     
-    # Calculate total failures for summary
-    kernel_failures = sum(test.get('failed', 0) for test in tests.get('kernel', {}).values())
-    userspace_failures = sum(test.get('failed', 0) for test in tests.get('userspace', {}).values())
-    total_failures = kernel_failures + userspace_failures
-    
     # Remove the full log from data before saving to JSON (to reduce file size)
     if 'log' in data:
         del data['log']
-    
+
+    return data
+
+
+def render_data(data, compact=False):
+    """
+    Render the JSON data file and the JSON payload of the dashboard HTML
+    for prepared data, minified if compact is set.
+    """
+    return format_json(data, 2, compact), format_json(data, 4, compact)
+
+
+def get_index_row(html_file, data):
+    """
+    Build the index row of a run from its HTML file name and data.
+    """
+    tests = data.get('tests', {})
+
+    # Calculate total failures for summary
+    kernel_failures = sum(test.get('failed', 0) for test in tests.get('kernel', {}).values())
+    userspace_failures = sum(test.get('failed', 0) for test in tests.get('userspace', {}).values())
+
+    return {
+        'url': html_file,
+        'display_name': html_file.replace('.html', ''),
+        'type': data.get('kernel_type', 'development'),
+        'date': data.get('date', ''),
+        'failure_count': kernel_failures + userspace_failures
+    }
+
+
+def load_index_rows(mm_dir, shell=False):
+    """
+    Load the index rows of the runs already written to the mm directory.
+    """
+    return load_run_index_rows(mm_dir, get_index_row, shell)
+
+
+def write_data(data, output_dir, index, writer, rendered=None):
+    """
+    Write the dashboard files for prepared data and add the run to the index.
+    Of the runs sharing a file name only the newest is kept, see
+    lib/run_names.py, returns None if a newer run already holds it. The
+    index page itself is only written when the index accumulator is flushed.
+    """
+    if rendered is None:
+        rendered = render_data(data, writer.compact)
+    json_data, html_data = rendered
+
     # Create directory for memory management tests
     mm_dir = os.path.join(output_dir, 'mm')
     os.makedirs(mm_dir, exist_ok=True)
@@ -133,78 +213,44 @@ def process_data(data, output_dir):
     
     # Write the JSON data file
     json_path = os.path.join(mm_dir, html_filename.replace('.html', '.json'))
+
+    owner = load_run_data(json_path)
+    if owner and owner.get('commit') != data['commit'] and not is_newer_run(data, owner):
+        print(f"{json_path} holds a newer run, skipping commit {data['commit'][:8]}")
+        return None
     
-    # Remove existing file if it exists
-    if os.path.exists(json_path):
-        os.remove(json_path)
-    
-    with open(json_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    print(f"JSON data written to {json_path}")
+    if writer.write(json_path, json_data):
+        print(f"JSON data written to {json_path}")
     
     # Create HTML file path
     html_path = os.path.join(mm_dir, html_filename)
     
-    # Remove existing HTML if it exists
-    if os.path.exists(html_path):
-        os.remove(html_path)
-    
-    # Get the HTML template
-    template_html = create_html_template()
-    
-    # Replace placeholder with actual JSON data
-    dashboard_html = template_html.replace(
-        "const testData = DATA_PLACEHOLDER;", 
-        f"const testData = {json.dumps(data, indent=4)};"
-    )
-    
-    # Write the HTML dashboard
-    with open(html_path, 'w') as f:
-        f.write(dashboard_html)
-    
-    print(f"Dashboard HTML written to {html_path}")
-    
-    # Collect data for the index
-    index_result = {
-        'url': html_filename,
-        'display_name': html_filename.replace('.html', ''),
-        'type': data.get('kernel_type', 'development'),
-        'date': data.get('date', ''),
-        'failure_count': total_failures
-    }
-    
-    # Find all existing HTML files (except index.html) to compile index
-    all_results = [index_result]  # Start with the current result
-    html_files = [f for f in os.listdir(mm_dir) if f.endswith('.html') and f != 'index.html' and f != html_filename]
-    
-    for html_file in html_files:
-        # Find the corresponding JSON file
-        json_file = html_file.replace('.html', '.json')
-        json_path = os.path.join(mm_dir, json_file)
-        
-        if os.path.exists(json_path):
-            try:
-                with open(json_path, 'r') as f:
-                    file_data = json.load(f)
-                
-                # Calculate failures
-                k_fails = sum(test.get('failed', 0) for test in file_data.get('tests', {}).get('kernel', {}).values())
-                u_fails = sum(test.get('failed', 0) for test in file_data.get('tests', {}).get('userspace', {}).values())
-                
-                # Extract relevant information
-                result = {
-                    'url': html_file,
-                    'display_name': html_file.replace('.html', ''),
-                    'type': file_data.get('kernel_type', 'development'),
-                    'date': file_data.get('date', ''),
-                    'failure_count': k_fails + u_fails
-                }
-                
-                all_results.append(result)
-            except Exception as e:
-                print(f"Error processing {json_path}: {e}")
+    index_row = get_index_row(html_filename, data)
+
+    if writer.shell:
+        # The shared run.html fetches the JSON data of the run
+        write_run_shell(mm_dir, RUN_HTML_TEMPLATE, RUN_JS, writer)
+        index_row['url'] = get_run_url(index_row['display_name'])
+    else:
+        # Write the HTML dashboard with the actual JSON data
+        dashboard_html = render_template(HTML_TEMPLATE, {'DATA_PLACEHOLDER': html_data})
+        if writer.write(html_path, dashboard_html):
+            print(f"Dashboard HTML written to {html_path}")
     
-    # Update the index page
-    update_index_page(mm_dir, all_results)
+    # Add the current run to the index
+    index.add(mm_dir, index_row, load_index_rows, update_index_page, data)
     
     return html_path
+
+
+def process_data(data, output_dir):
+    """
+    Process memory management test data and generate dashboard files.
+    This is the main entry point for the mm_handler module.
+    """
+    writer = OutputWriter(output_dir)
+    index = IndexAccumulator(writer)
+    html_path = write_data(prepare_data(data), output_dir, index, writer)
+    index.flush()
+    writer.close()
+    return html_path
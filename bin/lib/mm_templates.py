@@ -1,6 +1,10 @@
 #!/usr/bin/python3
 # SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
 
+from lib.template_segments import compile_template
+from lib.run_shell import compile_run_shell
+from lib.static_assets import link_assets
+
 def create_html_template():
     """
     Generate the HTML dashboard template for memory management tests.
@@ -769,3 +773,12 @@ def create_index_template():
 </body>
 </html>
 """
+
+
+# Templates split at their placeholders once, pages are streamed from these
+# with render_template() instead of copying the whole template per page.
+# Pages live one level below the static asset directory.
+HTML_TEMPLATE = compile_template(link_assets(create_html_template(), "../"), ["DATA_PLACEHOLDER"])
+INDEX_TEMPLATE = compile_template(link_assets(create_index_template(), "../"), ["RESULTS_PLACEHOLDER"])
+# Shared run.html and run.js used instead of per-run pages by --shell
+RUN_HTML_TEMPLATE, RUN_JS = compile_run_shell(link_assets(create_html_template(), "../"))
@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import gzip
+import json
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content hashes of the files written to the output directory
+HASHES_FILE = '.output-hashes.json'
+# Files changed by the last run, relative to the output directory
+CHANGED_FILES = '.changed-files'
+# Files removed by the last run, relative to the output directory
+DELETED_FILES = '.deleted-files'
+
+# Files which get precompressed siblings, and how each sibling is made
+COMPRESSIBLE_SUFFIXES = ('.html', '.json', '.js')
+COMPRESSORS = {
+    'gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    'br': lambda data: brotli.compress(data),
+}
+
+
+def hash_file(path):
+    """
+    Compute the SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_output_hashes(output_dir):
+    """
+    Load the content hashes of the files written to an output directory, by
+    path relative to it.
+    """
+    hashes_path = os.path.join(output_dir, HASHES_FILE)
+    if not os.path.exists(hashes_path):
+        return {}
+
+    try:
+        with open(hashes_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error processing {hashes_path}: {e}")
+        return {}
+
+
+def format_json(data, indent, compact=False):
+    """
+    Serialize data for the dashboard, indented for reading or, when compact
+    is set, minified with sorted keys.
+    """
+    if compact:
+        return json.dumps(data, separators=(',', ':'), sort_keys=True)
+    return json.dumps(data, indent=indent)
+
+
+class OutputWriter:
+    """
+    Writes dashboard files only when their content changed, so unchanged
+    files keep their mtime and deploys only need to move real deltas.
+    The hash and size of every file written is remembered in the output
+    directory, so checking an unchanged file does not require reading it.
+    With shell set the handlers write one shared run.html per directory and
+    only the JSON of each run, see lib/run_shell.py. With compact set they
+    write minified JSON. Every HTML, JSON and JS file gets a sibling
+    compressed with each encoding of precompress ('gz', 'br'), so a static
+    web server can serve it without compressing on every request.
+    """
+
+    def __init__(self, output_dir, shell=False, compact=False, precompress=()):
+        self.output_dir = output_dir
+        self.shell = shell
+        self.compact = compact
+        self.precompress = precompress
+        self.hashes = load_output_hashes(output_dir)
+        self.changed = []
+        self.deleted = []
+
+    def is_unchanged(self, path, rel_path, digest, size):
+        """
+        Check whether the file at path already has the given content.
+        """
+        try:
+            current_size = os.path.getsize(path)
+        except OSError:
+            return False
+
+        if current_size != size:
+            return False
+
+        if self.hashes.get(rel_path) == digest:
+            return True
+
+        # Not written by us before, compare against what is there
+        return hash_file(path) == digest
+
+    def write(self, path, content):
+        """
+        Write content to path unless the file already holds exactly that.
+        The content is a string, bytes or a list of chunks of either, as
+        returned by render_template(), which are written out in order.
+        Returns True if the file was written.
+        """
+        if isinstance(content, (str, bytes)):
+            content = [content]
+        chunks = [c.encode() if isinstance(c, str) else c for c in content]
+
+        hasher = hashlib.sha256()
+        for chunk in chunks:
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        size = sum(len(chunk) for chunk in chunks)
+        rel_path = os.path.relpath(path, self.output_dir)
+
+        unchanged = self.is_unchanged(path, rel_path, digest, size)
+        if not unchanged:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.writelines(chunks)
+            self.changed.append(rel_path)
+
+        self.hashes[rel_path] = digest
+        if path.endswith(COMPRESSIBLE_SUFFIXES):
+            self.write_compressed(path, chunks, unchanged)
+        return not unchanged
+
+    def write_compressed(self, path, chunks, unchanged):
+        """
+        Bring the compressed siblings of path in line with its content.
+        Siblings of an unchanged file are only made if they are missing, and
+        siblings of encodings no longer requested are removed.
+        """
+        for encoding, compress in COMPRESSORS.items():
+            sibling = f"{path}.{encoding}"
+            if encoding not in self.precompress:
+                if os.path.exists(sibling):
+                    os.remove(sibling)
+                    self.deleted.append(os.path.relpath(sibling, self.output_dir))
+                continue
+
+            rel_path = os.path.relpath(sibling, self.output_dir)
+            if unchanged and rel_path in self.hashes and os.path.exists(sibling):
+                continue
+
+            self.write(sibling, compress(b''.join(chunks)))
+
+    def remove(self, path):
+        """
+        Remove path and its compressed siblings if they exist, listing them
+        as removed.
+        """
+        for file_path in [path] + [f"{path}.{encoding}" for encoding in COMPRESSORS]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                self.deleted.append(os.path.relpath(file_path, self.output_dir))
+
+    def close(self):
+        """
+        Save the content hashes and the lists of files changed and removed
+        by this run.
+        """
+        if not os.path.isdir(self.output_dir):
+            return
+
+        # Forget files which are gone. Whatever removed them, such as a full
+        # rebuild clearing the output directory, they are listed as removed
+        hashes = {}
+        for rel_path, digest in self.hashes.items():
+            if os.path.exists(os.path.join(self.output_dir, rel_path)):
+                hashes[rel_path] = digest
+            else:
+                self.deleted.append(rel_path)
+        self.hashes = hashes
+        deleted = {rel_path for rel_path in self.deleted
+                   if not os.path.exists(os.path.join(self.output_dir, rel_path))}
+
+        with open(os.path.join(self.output_dir, HASHES_FILE), 'w') as f:
+            json.dump(self.hashes, f, indent=2, sort_keys=True)
+
+        changed_path = os.path.join(self.output_dir, CHANGED_FILES)
+        with open(changed_path, 'w') as f:
+            f.writelines(f"{rel_path}\n" for rel_path in sorted(set(self.changed)))
+
+        deleted_path = os.path.join(self.output_dir, DELETED_FILES)
+        with open(deleted_path, 'w') as f:
+            f.writelines(f"{rel_path}\n" for rel_path in sorted(deleted))
+
+        print(f"{len(set(self.changed))} files changed, list written to {changed_path}")
+        if deleted:
+            print(f"{len(deleted)} files removed, list written to {deleted_path}")
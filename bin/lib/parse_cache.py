@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import json
+import sqlite3
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed commits keyed by commit ID. Commits in the archive
+    are immutable, so a parsed record stays valid for as long as the parser
+    that produced it does not change. Each entry therefore carries the
+    version of the parser which produced it and callers are expected to
+    ignore entries whose version does not match the current one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS parsed_commits (
+                commit_id TEXT PRIMARY KEY,
+                test_type TEXT,
+                version TEXT NOT NULL,
+                data TEXT
+            )
+        """)
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Commit pending entries and close the database.
+        """
+        if self.db:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def get(self, commit_id):
+        """
+        Returns (test_type, version, data) for a cached commit or None.
+        A test_type of None records a commit without results to process.
+        """
+        row = self.db.execute(
+            "SELECT test_type, version, data FROM parsed_commits WHERE commit_id = ?",
+            (commit_id,)
+        ).fetchone()
+        if not row:
+            return None
+
+        test_type, version, data = row
+        return test_type, version, json.loads(data) if data else None
+
+    def get_versions(self):
+        """
+        Returns {commit_id: (test_type, version)} for every cached commit,
+        without decoding their data.
+        """
+        return {commit_id: (test_type, version) for commit_id, test_type, version in
+                self.db.execute("SELECT commit_id, test_type, version FROM parsed_commits")}
+
+    def put(self, commit_id, test_type, version, data):
+        """
+        Store the parsed data of a commit, replacing any older entry.
+        """
+        self.db.execute(
+            "INSERT OR REPLACE INTO parsed_commits VALUES (?, ?, ?, ?)",
+            (commit_id, test_type, version, json.dumps(data) if data is not None else None)
+        )
+        self.pending += 1
+        if self.pending >= 1000:
+            self.db.commit()
+            self.pending = 0
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import json
+import lzma
+import fnmatch
+import tarfile
+
+from lib.xz_index import XzBlock, parse_xz_blocks, read_range
+
+# Members the result parsers care about, matched against the base name
+RESULT_MEMBER_PATTERNS = ['result.xml', '*.out.bad', '*.full', '*.dmesg']
+
+# Tarballs which were not fetched with git lfs are small text files
+# starting with this line instead
+LFS_POINTER_PREFIX = b'version https://git-lfs.github.com/spec/'
+
+# Errors reading a truncated, corrupt or non tar result tarball
+TARBALL_ERRORS = (OSError, EOFError, ValueError, lzma.LZMAError, tarfile.TarError)
+
+# Sidecar index written next to a result tarball
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 1
+
+
+class LfsPointerError(Exception):
+    """
+    Raised when a result tarball is only a git lfs pointer.
+    """
+
+
+def is_lfs_pointer(path):
+    """
+    Check whether path is a git lfs pointer instead of the actual file.
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def find_tarballs(paths):
+    """
+    Expand directories to the xz tarballs below them, in sorted order.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(files):
+                if name.endswith('.xz'):
+                    yield os.path.join(root, name)
+
+
+def match_member(name, patterns):
+    """
+    Check whether the base name of a member matches one of the patterns.
+    """
+    base_name = os.path.basename(name)
+    return any(fnmatch.fnmatchcase(base_name, pattern) for pattern in patterns)
+
+
+def iter_members(path, patterns=RESULT_MEMBER_PATTERNS):
+    """
+    Stream the regular file members of an xz result tarball matching the
+    patterns, yielding (member, fileobj) one at a time. The tarball is read
+    front to back once and nothing is extracted, so memory use does not
+    depend on the size of the archive. fileobj is only readable until the
+    next member is requested. patterns of None yields every file.
+    Raises LfsPointerError for tarballs which are still git lfs pointers.
+    """
+    if is_lfs_pointer(path):
+        raise LfsPointerError(f"{path} is a git lfs pointer, run git lfs pull")
+
+    # lzma reads concatenated xz streams, as written by compress_multiblock,
+    # where the 'r|xz' mode of tarfile stops after the first one
+    with lzma.open(path, 'rb') as f, tarfile.open(fileobj=f, mode='r|') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            if patterns is not None and not match_member(member.name, patterns):
+                continue
+
+            yield member, tar.extractfile(member)
+
+
+def read_members(path, patterns=RESULT_MEMBER_PATTERNS, limit=None):
+    """
+    Stream the matching members of a result tarball, yielding
+    (name, content) with the content as bytes, truncated to limit bytes if
+    given so a huge .full file cannot exhaust memory.
+    """
+    for member, fileobj in iter_members(path, patterns):
+        yield member.name, fileobj.read(limit)
+
+
+def get_index_path(path):
+    """
+    Get the path of the sidecar index of a result tarball.
+    """
+    return path + INDEX_SUFFIX
+
+
+def build_member_index(path):
+    """
+    Build the sidecar index of a result tarball: the xz blocks, from the
+    xz index so without decompressing, and the offset and size of every
+    member in the decompressed tar, from one streaming pass.
+    """
+    with open(path, 'rb') as f:
+        blocks = parse_xz_blocks(f)
+
+    members = {member.name: [member.offset_data, member.size]
+               for member, fileobj in iter_members(path, None)}
+
+    return {
+        'version': INDEX_VERSION,
+        'tarball_size': os.path.getsize(path),
+        'blocks': [[block.offset, block.padded_size, block.uncompressed_offset,
+                    block.uncompressed_size, block.stream_flags.hex()] for block in blocks],
+        'members': members,
+    }
+
+
+def write_member_index(path, index):
+    """
+    Write the sidecar index of a result tarball.
+    """
+    with open(get_index_path(path), 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+
+
+def load_member_index(path):
+    """
+    Load the sidecar index of a result tarball, or None if there is none or
+    it does not match the tarball anymore.
+    """
+    index_path = get_index_path(path)
+    if not os.path.exists(index_path):
+        return None
+
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error processing {index_path}: {e}")
+        return None
+
+    if index.get('version') != INDEX_VERSION or index.get('tarball_size') != os.path.getsize(path):
+        return None
+
+    return index
+
+
+def read_member(path, name, index=None):
+    """
+    Read a single member of a result tarball. With a sidecar index only the
+    xz blocks holding the member are decompressed, otherwise the tarball is
+    streamed up to the member. Returns None if there is no such member.
+    """
+    if index is None:
+        index = load_member_index(path)
+
+    if index is None:
+        for member, fileobj in iter_members(path, None):
+            if member.name == name:
+                return fileobj.read()
+        return None
+
+    if name not in index['members']:
+        return None
+
+    offset, size = index['members'][name]
+    blocks = [XzBlock(block[0], block[1], block[2], block[3], bytes.fromhex(block[4]))
+              for block in index['blocks']]
+    with open(path, 'rb') as f:
+        return read_range(f, blocks, offset, size)
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+from lib.commit_parser import get_parser_version, parse_commit_results
+from lib.git_reader import CommitReader, get_root_commit, is_ancestor, iter_commit_records
+from lib.handlers import HANDLER_MODULES, get_out_of_tree_types
+from lib.results_store import ResultsStore
+
+# Default location of the index, at the top of the archive. It is a results
+# store holding every test commit as a run of its own, listed under its test
+# type, so history questions are answered without going through git.
+INDEX_FILE = '.results-index.sqlite'
+
+# Test type queried by default. Other test types, such as the kdevops CI
+# runs, also run fstests profiles but do not belong in their history.
+DEFAULT_TEST_TYPE = 'fs'
+
+
+def get_index_version():
+    """
+    Get the version stamp of the index, which changes whenever any of the
+    parsers filling it does.
+    """
+    test_types = sorted(HANDLER_MODULES) + get_out_of_tree_types()
+    return ",".join(f"{test_type}={get_parser_version(test_type)}" for test_type in test_types)
+
+
+def update_results_index(store, end_commit="HEAD"):
+    """
+    Add the test commits up to end_commit which are not indexed yet. The
+    index is rebuilt from scratch if a parser changed or history was
+    rewritten since it was last updated. Returns the number of runs added.
+    """
+    with CommitReader() as reader:
+        commit = reader.read(end_commit)
+    if not commit:
+        raise ValueError(f"Failed to retrieve commit {end_commit}")
+    end_commit = commit['commit']
+
+    version = get_index_version()
+    last_commit = store.get_meta('last_commit')
+    if last_commit == end_commit and store.get_meta('version') == version:
+        return 0
+
+    if store.get_meta('version') == version and last_commit and is_ancestor(last_commit, end_commit):
+        start_commit = last_commit
+    else:
+        store.clear()
+        start_commit = get_root_commit(end_commit)
+
+    added = 0
+    for commit_id, subject, date, log in iter_commit_records(start_commit, end_commit):
+        test_type, data = parse_commit_results(commit_id, subject, date, log)
+        if not test_type or data is None:
+            continue
+
+        row = {'display_name': commit_id, 'url': commit_id, 'date': date}
+        store.add_run(test_type, row, data)
+        added += 1
+
+    store.set_meta('last_commit', end_commit)
+    store.set_meta('version', version)
+    store.commit()
+    return added
+
+
+def open_results_index(path=INDEX_FILE, end_commit="HEAD", update=True):
+    """
+    Open the index at path, creating it if needed, and bring it up to date
+    with end_commit unless update is False.
+    """
+    store = ResultsStore(path)
+    if update:
+        update_results_index(store, end_commit)
+    return store
+
+
+def get_filters(columns, **patterns):
+    """
+    Build the WHERE clause matching each column of columns, a dict of
+    filter name to column, against its glob pattern in patterns. Filters
+    without a pattern are left out.
+    """
+    clauses = []
+    params = []
+    for name, pattern in patterns.items():
+        if pattern:
+            clauses.append(f"{columns[name]} GLOB ?")
+            params.append(pattern)
+
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def query_failures(store, test=None, profile=None, kernel=None, filesystem=None,
+                   test_type=DEFAULT_TEST_TYPE):
+    """
+    List every failure of the tests matching the filters, oldest first.
+    """
+    where, params = get_filters(
+        {'test': 'f.test', 'profile': 'f.profile', 'kernel': 'r.kernel',
+         'filesystem': 'r.filesystem', 'test_type': 'r.test_type'},
+        test=test, profile=profile, kernel=kernel, filesystem=filesystem, test_type=test_type)
+    return store.query(
+        "SELECT r.date, r.kernel, r.filesystem, f.profile, f.test, r.commit_id AS 'commit' "
+        "FROM failures f JOIN runs r USING (run_id)" + where +
+        " ORDER BY r.timestamp, r.commit_id, f.profile, f.test", params)
+
+
+def query_history(store, test, profile=None, kernel=None, filesystem=None,
+                  test_type=DEFAULT_TEST_TYPE):
+    """
+    List whether the tests matching the test pattern passed or failed in
+    every run of the matching profiles, oldest first. A run counts as a
+    pass when none of them is among the failures of the profile.
+    """
+    where, params = get_filters(
+        {'profile': 'p.profile', 'kernel': 'r.kernel', 'filesystem': 'r.filesystem',
+         'test_type': 'r.test_type'},
+        profile=profile, kernel=kernel, filesystem=filesystem, test_type=test_type)
+    return store.query(
+        "SELECT r.date, r.kernel, r.filesystem, p.profile, "
+        "CASE WHEN EXISTS (SELECT 1 FROM failures f WHERE f.run_id = p.run_id "
+        "AND f.profile = p.profile AND f.test GLOB ?) THEN 'fail' ELSE 'pass' END AS status, "
+        "r.commit_id AS 'commit' "
+        "FROM profiles p JOIN runs r USING (run_id)" + where +
+        " ORDER BY r.timestamp, r.commit_id, p.profile", [test] + params)
+
+
+def get_failing_since(history):
+    """
+    Get the run each profile of a history from query_history() has been
+    failing since, by profile. Profiles passing in their latest run are left
+    out.
+    """
+    failing_since = {}
+    for row in history:
+        if row['status'] == 'fail':
+            failing_since.setdefault(row['profile'], row)
+        else:
+            failing_since.pop(row['profile'], None)
+    return failing_since
+
+
+def query_runs(store, test=None, profile=None, kernel=None, filesystem=None,
+               test_type=DEFAULT_TEST_TYPE):
+    """
+    List the profiles of every run matching the filters, oldest first. With
+    a test, only the runs of the profiles in which it failed.
+    """
+    where, params = get_filters(
+        {'profile': 'p.profile', 'kernel': 'r.kernel', 'filesystem': 'r.filesystem',
+         'test_type': 'r.test_type'},
+        profile=profile, kernel=kernel, filesystem=filesystem, test_type=test_type)
+    if test:
+        where += (" AND " if where else " WHERE ") + (
+            "EXISTS (SELECT 1 FROM failures f WHERE f.run_id = p.run_id "
+            "AND f.profile = p.profile AND f.test GLOB ?)")
+        params.append(test)
+    return store.query(
+        "SELECT r.date, r.kernel, r.filesystem, p.profile, p.test_count AS tests, "
+        "p.failure_count AS failures, p.skipped_count AS skipped, r.commit_id AS 'commit' "
+        "FROM profiles p JOIN runs r USING (run_id)" + where +
+        " ORDER BY r.timestamp, r.commit_id, p.profile", params)
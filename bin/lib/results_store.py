@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import json
+import sqlite3
+
+from lib.git_reader import parse_git_date
+
+# One row per run listed on the dashboard. index_dir is the directory of the
+# run relative to the output directory and row its index row as rendered on
+# the index page. timestamp is date as a Unix timestamp, to order runs by,
+# as date strings from different time zones do not sort. The commit and
+# kernel columns are NULL for runs imported from dashboards written before
+# the store existed.
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY,
+        index_dir TEXT NOT NULL,
+        display_name TEXT NOT NULL,
+        url TEXT NOT NULL,
+        date TEXT NOT NULL,
+        timestamp INTEGER NOT NULL DEFAULT 0,
+        commit_id TEXT,
+        test_type TEXT,
+        subject TEXT,
+        kernel TEXT,
+        base_version TEXT,
+        commit_hash TEXT,
+        kernel_type TEXT,
+        filesystem TEXT,
+        row TEXT NOT NULL,
+        UNIQUE (index_dir, display_name)
+    );
+    CREATE TABLE IF NOT EXISTS profiles (
+        run_id INTEGER NOT NULL,
+        profile TEXT NOT NULL,
+        test_count INTEGER,
+        failure_count INTEGER,
+        skipped_count INTEGER,
+        duration INTEGER,
+        PRIMARY KEY (run_id, profile)
+    );
+    CREATE TABLE IF NOT EXISTS failures (
+        run_id INTEGER NOT NULL,
+        profile TEXT NOT NULL,
+        test TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS tests (
+        run_id INTEGER NOT NULL,
+        profile TEXT,
+        test TEXT NOT NULL,
+        status TEXT NOT NULL,
+        seconds REAL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_id);
+    CREATE INDEX IF NOT EXISTS runs_kernel ON runs (kernel);
+    CREATE INDEX IF NOT EXISTS runs_filesystem ON runs (filesystem);
+    CREATE INDEX IF NOT EXISTS profiles_profile ON profiles (profile);
+    CREATE INDEX IF NOT EXISTS failures_run ON failures (run_id);
+    CREATE INDEX IF NOT EXISTS failures_test ON failures (test, profile);
+    CREATE INDEX IF NOT EXISTS failures_profile ON failures (profile);
+    CREATE INDEX IF NOT EXISTS tests_run ON tests (run_id);
+    CREATE INDEX IF NOT EXISTS tests_test ON tests (test, profile);
+    CREATE INDEX IF NOT EXISTS tests_profile ON tests (profile);
+"""
+
+# Index the index rows are listed by, made once the timestamp column exists.
+# It replaces the index on (index_dir, date) of older stores.
+RUN_ORDER_INDEX = """
+    DROP INDEX IF EXISTS runs_index_dir;
+    CREATE INDEX IF NOT EXISTS runs_index_dir_timestamp ON runs (index_dir, timestamp, url);
+"""
+
+# Tables holding the details of a run
+DETAIL_TABLES = ['profiles', 'failures', 'tests']
+
+
+class ResultsStore:
+    """
+    SQLite store of every run on the dashboard, with its fstests profiles,
+    failures and per test results, indexed on kernel, filesystem, profile
+    and test. The index pages are rendered from it, so adding a run never
+    needs to read the other runs back from the output directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.add_timestamps()
+        self.db.executescript(RUN_ORDER_INDEX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Commit pending changes and close the database.
+        """
+        if self.db:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def commit(self):
+        """
+        Commit pending changes.
+        """
+        self.db.commit()
+
+    def add_timestamps(self):
+        """
+        Add the timestamp column to the runs of stores written before it
+        existed.
+        """
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(runs)")]
+        if 'timestamp' in columns:
+            return
+
+        self.db.execute("ALTER TABLE runs ADD COLUMN timestamp INTEGER NOT NULL DEFAULT 0")
+        self.db.executemany(
+            "UPDATE runs SET timestamp = ? WHERE run_id = ?",
+            [(parse_git_date(date), run_id)
+             for run_id, date in self.db.execute("SELECT run_id, date FROM runs").fetchall()]
+        )
+        self.db.commit()
+
+    def clear(self):
+        """
+        Remove every run, for full rebuilds.
+        """
+        for table in ['runs'] + DETAIL_TABLES:
+            self.db.execute(f"DELETE FROM {table}")
+
+    def get_meta(self, key):
+        """
+        Get a bookkeeping value of whoever fills the store, or None.
+        """
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        """
+        Set a bookkeeping value.
+        """
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def query(self, sql, params=()):
+        """
+        Run a query, returns its rows as dicts keyed by column name.
+        """
+        cursor = self.db.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def add_run(self, index_dir, row, data=None):
+        """
+        Add or replace the run listed as row['display_name'] in index_dir.
+        data is the data the handler prepared for the run, its fstests
+        profiles and failures are stored along with it. Returns the run ID.
+        """
+        data = data or {}
+        old = self.db.execute(
+            "SELECT run_id FROM runs WHERE index_dir = ? AND display_name = ?",
+            (index_dir, row['display_name'])
+        ).fetchone()
+        if old:
+            self.delete_run(old[0])
+
+        run_id = self.db.execute(
+            "INSERT INTO runs (index_dir, display_name, url, date, timestamp, commit_id, test_type, "
+            "subject, kernel, base_version, commit_hash, kernel_type, filesystem, row) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (index_dir, row['display_name'], row['url'], row.get('date', ''),
+             parse_git_date(row.get('date')), data.get('commit'), data.get('test_type'),
+             data.get('subject'), data.get('kernel'), data.get('base_version'), data.get('commit_hash'), data.get('kernel_type'),
+             data.get('filesystem'), json.dumps(row))
+        ).lastrowid
+
+        # Per test results belong to the commit, see add_tests(), a run moved
+        # to another name keeps them
+        if data.get('commit'):
+            self.db.execute(
+                "INSERT INTO tests SELECT ?, profile, test, status, seconds FROM tests "
+                "WHERE run_id = (SELECT MIN(run_id) FROM runs WHERE commit_id = ? AND run_id != ?)",
+                (run_id, data['commit'], run_id)
+            )
+
+        profiles = data.get('profiles') or {}
+        self.db.executemany(
+            "INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?)",
+            [(run_id, profile, p.get('test_count'), p.get('failure_count'),
+              p.get('skipped_count'), p.get('duration')) for profile, p in profiles.items()]
+        )
+        self.db.executemany(
+            "INSERT INTO failures VALUES (?, ?, ?)",
+            [(run_id, profile, test)
+             for profile, p in profiles.items() for test in p.get('failures', [])]
+        )
+        return run_id
+
+    def delete_run(self, run_id):
+        """
+        Remove a run and its details.
+        """
+        for table in DETAIL_TABLES:
+            self.db.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        self.db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def add_tests(self, commit_id, tests):
+        """
+        Store the per test results of the runs of a commit, as
+        (test, profile, status, seconds) rows, replacing older ones.
+        """
+        for (run_id,) in self.db.execute(
+                "SELECT run_id FROM runs WHERE commit_id = ?", (commit_id,)).fetchall():
+            self.db.execute("DELETE FROM tests WHERE run_id = ?", (run_id,))
+            self.db.executemany(
+                "INSERT INTO tests VALUES (?, ?, ?, ?, ?)",
+                [(run_id, profile, test, status, seconds)
+                 for test, profile, status, seconds in tests]
+            )
+
+    def get_index_rows(self, index_dir):
+        """
+        Get the index rows of the runs in index_dir, newest first.
+        """
+        return [json.loads(row) for (row,) in self.db.execute(
+            "SELECT row FROM runs WHERE index_dir = ? ORDER BY timestamp DESC, url DESC",
+            (index_dir,)
+        )]
+
+    def get_index_dirs(self):
+        """
+        Get the directories holding runs, sorted.
+        """
+        return [index_dir for (index_dir,) in self.db.execute(
+            "SELECT DISTINCT index_dir FROM runs ORDER BY index_dir"
+        )]
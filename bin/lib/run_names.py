@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import json
+
+from lib.git_reader import parse_git_date
+
+# Runs of the same kernel compete for the same file name. The newest run,
+# by date and then commit ID, always gets it, so which run a file name
+# belongs to does not depend on the order the commits were processed in:
+# a full rebuild and a series of incremental updates name runs the same.
+
+
+def get_run_order(data):
+    """
+    Get the sort key of a run by its data, later runs sort higher.
+    """
+    return parse_git_date(data.get('date')), data.get('commit') or ''
+
+
+def is_newer_run(data, other):
+    """
+    Check whether the run of data is newer than the run of other.
+    """
+    return get_run_order(data) > get_run_order(other)
+
+
+def load_run_data(json_path):
+    """
+    Load the data of the run written to json_path, or None if there is no
+    run there.
+    """
+    try:
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return data if isinstance(data, dict) else None
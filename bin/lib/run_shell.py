@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import re
+import json
+
+from lib.template_segments import compile_template, render_template
+from lib.index_accumulator import MANIFEST_FILE
+from lib.flakiness import FLAKINESS_FILE
+
+# Shared page showing any run of a directory, and its script
+RUN_HTML = 'run.html'
+RUN_JS = 'run.js'
+
+# JSON files of a run directory which do not hold a run
+NON_RUN_JSON_FILES = (MANIFEST_FILE, FLAKINESS_FILE)
+
+# Replaces the embedded data of the per-run page template. The run to show
+# is named by the URL fragment, run.html#v6.15 shows v6.15.json.
+RUN_DATA_LOADER = """// Test data is fetched from the JSON of the run named by the URL fragment
+        function loadTestData() {
+            const run = decodeURIComponent(window.location.hash.substring(1));
+            return fetch(encodeURIComponent(run) + '.json')
+                .then(response => response.json());
+        }
+
+        // Links between runs only change the fragment
+        window.addEventListener('hashchange', function() {
+            window.location.reload();
+        });"""
+
+
+def compile_run_shell(template, placeholders=()):
+    """
+    Turn a per-run page template, which embeds its data through
+    DATA_PLACEHOLDER, into a static shell shared by all runs of a directory.
+    Returns the compiled run.html template, which may still use the given
+    placeholders, and the contents of run.js which loads the data instead.
+    """
+    data_start = template.index("DATA_PLACEHOLDER")
+    script_start = template.rindex("<script>", 0, data_start)
+    script_end = template.index("</script>", data_start)
+
+    script = template[script_start + len("<script>"):script_end]
+    script = re.sub(r"[ \t]*// Test data will be injected here\n", "", script)
+    for old, new in [("const testData = DATA_PLACEHOLDER;", RUN_DATA_LOADER),
+                     ("initDashboard(testData);", "loadTestData().then(initDashboard);")]:
+        if old not in script:
+            raise ValueError(f"Template script does not contain '{old}'")
+        script = script.replace(old, new)
+
+    html = (template[:script_start] + f'<script src="{RUN_JS}"></script>' +
+            template[script_end + len("</script>"):])
+
+    return compile_template(html, placeholders), script.strip("\n") + "\n"
+
+
+def get_run_url(name):
+    """
+    Get the URL of a run shown through the shared run.html.
+    """
+    return f"{RUN_HTML}#{name}"
+
+
+def load_run_index_rows(run_dir, get_index_row, shell=False):
+    """
+    Load the index rows of the runs already written to a directory, with
+    get_index_row(html_file, data) of its handler. Runs are found by their
+    JSON file, as with shell set they have no page of their own and are
+    linked through the shared run.html. Otherwise only runs with a page are
+    listed.
+    """
+    if not os.path.isdir(run_dir):
+        return []
+
+    rows = []
+    for json_file in sorted(os.listdir(run_dir)):
+        if not json_file.endswith('.json') or json_file in NON_RUN_JSON_FILES:
+            continue
+
+        html_file = json_file[:-len('.json')] + '.html'
+        if not shell and not os.path.exists(os.path.join(run_dir, html_file)):
+            continue
+
+        json_path = os.path.join(run_dir, json_file)
+        try:
+            with open(json_path, 'r') as f:
+                row = get_index_row(html_file, json.load(f))
+        except Exception as e:
+            print(f"Error processing {json_path}: {e}")
+            continue
+
+        if shell:
+            row['url'] = get_run_url(row['display_name'])
+        rows.append(row)
+
+    return rows
+
+
+def write_run_shell(run_dir, html_template, js, writer, values=None):
+    """
+    Write the shared run.html and run.js of a directory.
+    """
+    html = render_template(html_template, values or {})
+    if writer.write(os.path.join(run_dir, RUN_HTML), html):
+        print(f"Run shell written to {os.path.join(run_dir, RUN_HTML)}")
+    writer.write(os.path.join(run_dir, RUN_JS), js)
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import base64
+import hashlib
+
+from lib.paths import REPO_DIR
+
+# Where the assets end up in the output directory
+STATIC_DIR = 'static'
+
+# Remote URLs used by the templates, the vendored copy of each, relative to
+# the repository, and the Subresource Integrity (sha256-/sha384-/sha512-
+# followed by the base64 digest) the copy must have, as cdnjs publishes it.
+# bin/update-static-assets.py downloads missing copies and rejects those
+# which do not match. The dashboard is only generated once every asset is
+# pinned and vendored.
+ASSETS = [
+    ("https://cdnjs.cloudflare.com/ajax/libs/Chart.js/3.9.1/chart.min.js",
+     "static/chart-3.9.1.min.js",
+     "sha512-ElRFoEQdI5Ht6kZvyzXhYG9NqjtkmlkfYk0wr6wHxU9JEHakS7UJZNeml5ALk+8IKlU6jDgMabC3vkumRokgJA=="),
+    ("https://cdnjs.cloudflare.com/ajax/libs/jquery/3.6.0/jquery.min.js",
+     "static/jquery-3.6.0.min.js",
+     "sha512-894YE6QWD5I59HgZOGReFYm4dnWc1Qt5NtvYSaNcOP+u1T9qYdvdihz0PPSiiqn/+/3e7Jo4EaG7TubfWGUrMQ=="),
+    ("https://cdnjs.cloudflare.com/ajax/libs/moment.js/2.29.4/moment.min.js",
+     "static/moment-2.29.4.min.js",
+     "sha512-CryKbMe7sjSCDPl18jtJI5DR5jtkUWxPXWaLCst6QjH8wxDexfRJic2WRmRXmstr2Y8SxDDWuBO6CQC6IE4KTA=="),
+    ("https://github.com/linux-kdevops/kdevops/raw/main/images/kdevops-trans-bg-edited-individual-with-logo-gausian-blur-1600x1600.png",
+     "static/kdevops-bg.png", None),
+    ("https://github.com/linux-kdevops/kdevops-results-archive/raw/main/images/kdevops-archive.png",
+     "images/kdevops-archive.png",
+     "sha256-EkPqBHAFNaopBRW/kZqcKq/76tCj17ghgzXE5hknVPk="),
+]
+
+# Algorithms an integrity pin may use
+INTEGRITY_ALGORITHMS = ('sha256', 'sha384', 'sha512')
+
+# url -> (vendored path, hashed file name), for the vendored copies present
+_vendored = None
+
+
+def get_integrity(content, algorithm='sha256'):
+    """
+    Get the Subresource Integrity of the content of an asset.
+    """
+    digest = hashlib.new(algorithm, content).digest()
+    return f"{algorithm}-{base64.b64encode(digest).decode()}"
+
+
+def check_integrity(content, integrity):
+    """
+    Check the content of an asset against its pinned integrity.
+    """
+    algorithm = integrity.split('-', 1)[0]
+    if algorithm not in INTEGRITY_ALGORITHMS:
+        return False
+    return get_integrity(content, algorithm) == integrity
+
+
+def get_hashed_name(path, content):
+    """
+    Get the content-hashed file name of an asset, chart-3.9.1.min.js becomes
+    chart-3.9.1.min.<hash>.js, so it can be cached forever.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f"{stem}.{digest}{ext}"
+
+
+def get_vendored_assets():
+    """
+    Get the vendored assets which are present and match their pin, reading
+    each file only once.
+    """
+    global _vendored
+    if _vendored is None:
+        _vendored = {}
+        for url, rel_path, integrity in ASSETS:
+            path = os.path.join(REPO_DIR, rel_path)
+            if not integrity or not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                content = f.read()
+            if check_integrity(content, integrity):
+                _vendored[url] = (path, get_hashed_name(path, content))
+    return _vendored
+
+
+def get_asset_problems():
+    """
+    Get what keeps the assets from all being served from the static
+    directory: one message per asset which has no pin, is missing or does
+    not match its pin.
+    """
+    vendored = get_vendored_assets()
+    problems = []
+    for url, rel_path, integrity in ASSETS:
+        if not integrity:
+            problems.append(f"{rel_path} has no pinned integrity")
+        elif not os.path.exists(os.path.join(REPO_DIR, rel_path)):
+            problems.append(f"{rel_path} is missing")
+        elif url not in vendored:
+            problems.append(f"{rel_path} does not match its pinned integrity")
+    return problems
+
+
+def link_assets(html, prefix):
+    """
+    Point the asset URLs of a page at the hashed copies in the static
+    directory. prefix leads from the page to the top of the output
+    directory, "../" for pages in a subsystem directory. Assets without a
+    vendored copy keep their remote URL, which gen-dashboard.py only allows
+    with --remote-assets.
+    """
+    for url, (path, hashed_name) in get_vendored_assets().items():
+        html = html.replace(url, f"{prefix}{STATIC_DIR}/{hashed_name}")
+    return html
+
+
+def write_static_assets(output_dir, writer):
+    """
+    Copy the vendored assets into the static directory of the output under
+    their hashed names and report the ones still loaded remotely.
+    """
+    vendored = get_vendored_assets()
+    for url, rel_path, integrity in ASSETS:
+        if url not in vendored:
+            print(f"Warning: {rel_path} is not vendored, pages load it from {url}")
+            continue
+
+        path, hashed_name = vendored[url]
+        with open(path, 'rb') as f:
+            writer.write(os.path.join(output_dir, STATIC_DIR, hashed_name), f.read())
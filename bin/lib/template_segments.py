@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import re
+
+
+def compile_template(template, placeholders):
+    """
+    Split a template once into its static segments and the placeholders
+    between them. The result alternates encoded static segments and
+    placeholder names, starting and ending with a static segment.
+    """
+    if not placeholders:
+        return [template.encode()]
+
+    # Longest first, so a placeholder which prefixes another does not win
+    names = sorted(placeholders, key=len, reverse=True)
+    pattern = "(" + "|".join(re.escape(name) for name in names) + ")"
+
+    parts = re.split(pattern, template)
+    return [part.encode() if i % 2 == 0 else part for i, part in enumerate(parts)]
+
+
+def render_template(compiled, values):
+    """
+    Get the chunks making up a page rendered from a compiled template, in
+    order, without joining them into one large string. Placeholder values
+    are strings and are encoded once.
+    """
+    encoded = {name: value.encode() for name, value in values.items()}
+    return [part if i % 2 == 0 else encoded[part] for i, part in enumerate(compiled)]
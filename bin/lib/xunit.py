@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import os
+import xml.etree.ElementTree as ET
+
+# Status of a test in the per test rows
+PASS = 'pass'
+FAIL = 'fail'
+SKIP = 'skip'
+
+# Child elements of a testcase telling it did not pass
+STATUS_TAGS = {
+    'failure': FAIL,
+    'error': FAIL,
+    'skipped': SKIP,
+}
+
+
+def get_member_profile(name):
+    """
+    Get the profile of a result.xml member of a result tarball, which
+    fstests writes to <kernel>/<profile>/result.xml.
+    """
+    return os.path.basename(os.path.dirname(name)) or None
+
+
+def get_local_name(elem):
+    """
+    Get the tag of an element without its namespace, fstests writes
+    result.xml with a default xmlns so ElementTree reports {ns}testcase.
+    """
+    return elem.tag.rpartition('}')[2]
+
+
+def get_seconds(testcase):
+    """
+    Get the run time of a testcase, None if it does not record one.
+    """
+    try:
+        seconds = float(testcase.get('time'))
+    except (TypeError, ValueError):
+        return None
+    return int(seconds) if seconds.is_integer() else seconds
+
+
+def iter_xunit_rows(fileobj, profile=None):
+    """
+    Parse an fstests xunit result.xml incrementally, yielding a
+    (test, profile, status, seconds) row per testcase. The profile is taken
+    from the SECTION property, falling back to the given one. Each testcase
+    is dropped from the tree once read so memory use stays flat however
+    many tests the run has. Tags are compared by their local name as
+    fstests puts the elements in a default namespace:
+
+    >>> import io
+    >>> xml = io.BytesIO(b'''<?xml version="1.0" encoding="UTF-8"?>
+    ... <testsuite xmlns="https://git.kernel.org/pub/scm/fs/xfs/xfstests-dev.git"
+    ...  name="xfstests" failures="1" skipped="1" tests="3">
+    ...  <properties><property name="SECTION" value="xfs_crc"/></properties>
+    ...  <testcase classname="xfstests.global" name="generic/001" time="5"/>
+    ...  <testcase classname="xfstests.global" name="generic/002" time="0.5">
+    ...   <failure message="output mismatch" type="TestFail"/>
+    ...  </testcase>
+    ...  <testcase classname="xfstests.global" name="generic/003" time="0">
+    ...   <skipped message="not supported"/>
+    ...  </testcase>
+    ... </testsuite>''')
+    >>> list(iter_xunit_rows(xml))
+    [('generic/001', 'xfs_crc', 'pass', 5), ('generic/002', 'xfs_crc', 'fail', 0.5), ('generic/003', 'xfs_crc', 'skip', 0)]
+    """
+    root = None
+    for event, elem in ET.iterparse(fileobj, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event == 'start':
+            continue
+
+        tag = get_local_name(elem)
+        if tag == 'property':
+            if elem.get('name') == 'SECTION' and elem.get('value'):
+                profile = elem.get('value')
+        elif tag == 'testcase':
+            status = PASS
+            for child in elem:
+                child_tag = get_local_name(child)
+                if child_tag in STATUS_TAGS:
+                    status = STATUS_TAGS[child_tag]
+                    break
+            yield elem.get('name'), profile, status, get_seconds(elem)
+            root.clear()
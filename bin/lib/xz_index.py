@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import io
+import os
+import lzma
+import struct
+import zlib
+from collections import namedtuple
+
+# See the .xz file format specification for the layout parsed here
+HEADER_MAGIC = b'\xfd7zXZ\x00'
+FOOTER_MAGIC = b'YZ'
+STREAM_HEADER_SIZE = 12
+STREAM_FOOTER_SIZE = 12
+
+# A block of an xz file. offset and padded_size locate the block, from its
+# block header to its check, in the file and uncompressed_offset and
+# uncompressed_size its data in the decompressed output. stream_flags are
+# the flags of the stream holding it, needed to decode it on its own.
+XzBlock = namedtuple('XzBlock', ['offset', 'padded_size', 'uncompressed_offset',
+                                 'uncompressed_size', 'stream_flags'])
+
+
+def round_up4(size):
+    """
+    Round size up to the 4 byte alignment of xz blocks.
+    """
+    return (size + 3) & ~3
+
+
+def decode_varint(buf, pos):
+    """
+    Decode a multibyte integer of the xz format at buf[pos], returns the
+    value and the position after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+        if shift >= 63:
+            raise ValueError("Invalid xz multibyte integer")
+
+
+def parse_index(index):
+    """
+    Parse an xz index into a list of (unpadded_size, uncompressed_size),
+    one per block.
+    """
+    if index[0] != 0:
+        raise ValueError("Invalid xz index indicator")
+    if zlib.crc32(index[:-4]) != struct.unpack('<I', index[-4:])[0]:
+        raise ValueError("xz index CRC32 mismatch")
+
+    count, pos = decode_varint(index, 1)
+    records = []
+    for _ in range(count):
+        unpadded_size, pos = decode_varint(index, pos)
+        uncompressed_size, pos = decode_varint(index, pos)
+        records.append((unpadded_size, uncompressed_size))
+    return records
+
+
+def read_at(f, offset, size):
+    """
+    Read exactly size bytes at offset of f.
+    """
+    f.seek(offset)
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated xz file")
+    return data
+
+
+def parse_xz_blocks(f):
+    """
+    List the blocks of an xz file from the indexes of its streams, without
+    decompressing anything. Concatenated streams and stream padding are
+    supported, as produced by parallel xz or by concatenating xz files.
+    """
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    streams = []
+
+    while pos > 0:
+        # Skip stream padding
+        while pos >= 4 and read_at(f, pos - 4, 4) == b'\0\0\0\0':
+            pos -= 4
+
+        footer = read_at(f, pos - STREAM_FOOTER_SIZE, STREAM_FOOTER_SIZE)
+        if footer[10:] != FOOTER_MAGIC:
+            raise ValueError("Not an xz file, bad stream footer")
+        backward_size, stream_flags = struct.unpack('<I2s', footer[4:10])
+        index_size = (backward_size + 1) * 4
+        index_start = pos - STREAM_FOOTER_SIZE - index_size
+
+        records = parse_index(read_at(f, index_start, index_size))
+        blocks_size = sum(round_up4(unpadded) for unpadded, uncompressed in records)
+        stream_start = index_start - blocks_size - STREAM_HEADER_SIZE
+
+        header = read_at(f, stream_start, STREAM_HEADER_SIZE)
+        if header[:6] != HEADER_MAGIC or header[6:8] != stream_flags:
+            raise ValueError("Not an xz file, bad stream header")
+
+        streams.append((stream_start + STREAM_HEADER_SIZE, stream_flags, records))
+        pos = stream_start
+
+    blocks = []
+    uncompressed_offset = 0
+    for offset, stream_flags, records in reversed(streams):
+        for unpadded_size, uncompressed_size in records:
+            padded_size = round_up4(unpadded_size)
+            blocks.append(XzBlock(offset, padded_size, uncompressed_offset,
+                                  uncompressed_size, stream_flags))
+            offset += padded_size
+            uncompressed_offset += uncompressed_size
+
+    return blocks
+
+
+def decompress_block(f, block):
+    """
+    Decompress a single block, by handing it to the xz decoder behind a
+    stream header of its own.
+    """
+    stream_header = HEADER_MAGIC + block.stream_flags + struct.pack('<I', zlib.crc32(block.stream_flags))
+    decompressor = lzma.LZMADecompressor(lzma.FORMAT_XZ)
+    data = decompressor.decompress(stream_header + read_at(f, block.offset, block.padded_size))
+    if len(data) != block.uncompressed_size:
+        raise ValueError("xz block decompressed to an unexpected size")
+    return data
+
+
+def read_range(f, blocks, offset, size):
+    """
+    Read size bytes at offset of the decompressed output, decompressing
+    only the blocks holding them.
+    """
+    out = io.BytesIO()
+    end = offset + size
+    for block in blocks:
+        block_end = block.uncompressed_offset + block.uncompressed_size
+        if block_end <= offset or block.uncompressed_offset >= end:
+            continue
+        data = decompress_block(f, block)
+        start = max(offset - block.uncompressed_offset, 0)
+        out.write(data[start:min(end, block_end) - block.uncompressed_offset])
+    return out.getvalue()
+
+
+def compress_multiblock(src, dst, block_size=1 << 20, preset=6):
+    """
+    Compress the file object src into dst as an xz file made of one block
+    per block_size bytes of input, so single blocks can be decoded on their
+    own. Each block is written as its own stream, which every xz decoder
+    reads as one file.
+    """
+    empty = True
+    while True:
+        chunk = src.read(block_size)
+        if not chunk:
+            break
+        dst.write(lzma.compress(chunk, format=lzma.FORMAT_XZ, preset=preset))
+        empty = False
+
+    if empty:
+        dst.write(lzma.compress(b'', format=lzma.FORMAT_XZ, preset=preset))
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import os
+import json
+import argparse
+import contextlib
+
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.results_index import (DEFAULT_TEST_TYPE, INDEX_FILE, get_failing_since,
+                               open_results_index, query_failures, query_history, query_runs)
+
+
+def format_table(rows):
+    """
+    Format rows as a table with a header, commits abbreviated.
+    """
+    if not rows:
+        return "No results"
+
+    columns = list(rows[0])
+    cells = [[column.upper() for column in columns]]
+    for row in rows:
+        cells.append([str(row[column])[:12] if column == 'commit' else
+                      "" if row[column] is None else str(row[column]) for column in columns])
+
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip()
+                     for line in cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer questions about the test history of the archive from a local index"
+    )
+    parser.add_argument("query", choices=["failures", "history", "runs"],
+                        help="failures: every failure of the matching tests, "
+                             "history: pass or fail of --test in every run of the matching profiles, "
+                             "failing when any matching test failed, "
+                             "runs: the matching runs and their counts")
+    parser.add_argument("-t", "--test", help="Test, for example generic/475")
+    parser.add_argument("-p", "--profile", help="Profile, for example xfs_reflink_4k")
+    parser.add_argument("-k", "--kernel", help="Kernel, for example '6.15.0-rc*'")
+    parser.add_argument("-f", "--filesystem", help="Filesystem, for example ext4")
+    parser.add_argument("--type", default=DEFAULT_TEST_TYPE,
+                        help="Test type of the runs, for example fs or kdevops (default: " +
+                             DEFAULT_TEST_TYPE + ")")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--index", default=INDEX_FILE,
+                        help="Index file (default: " + INDEX_FILE + ")")
+    parser.add_argument("--no-update", action="store_true",
+                        help="Query the index as is, without adding new commits first")
+    parser.add_argument("-c", "--commit", default="HEAD",
+                        help="Index the history up to this commit (default: HEAD)")
+    args = parser.parse_args()
+
+    if args.query == "history" and not args.test:
+        parser.error("history needs --test")
+
+    # Indexing progress must not end up in the results
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            store = open_results_index(args.index, args.commit, not args.no_update)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    filters = dict(test=args.test, profile=args.profile, kernel=args.kernel,
+                   filesystem=args.filesystem, test_type=args.type)
+    if args.query == "failures":
+        rows = query_failures(store, **filters)
+    elif args.query == "history":
+        rows = query_history(store, **filters)
+    else:
+        rows = query_runs(store, **filters)
+    store.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_table(rows))
+
+    if args.query == "history" and rows and not args.json:
+        failing_since = get_failing_since(rows)
+        print()
+        for profile in sorted({row['profile'] for row in rows}):
+            row = failing_since.get(profile)
+            if row:
+                print(f"{profile}: failing since {row['kernel']} ({row['date']}, {row['commit'][:12]})")
+            else:
+                print(f"{profile}: passing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: GPL-2.0 OR copyleft-next-0.3.1
+
+import sys
+import os
+import argparse
+import urllib.request
+
+# Add the current directory to the Python path to find the lib modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.paths import REPO_DIR
+from lib.static_assets import ASSETS, check_integrity, get_integrity
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download the vendored copies of the assets used by the dashboard"
+    )
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Download assets which are already vendored again")
+    args = parser.parse_args()
+
+    failed = 0
+    for url, rel_path, integrity in ASSETS:
+        if not integrity:
+            print(f"Error: {rel_path} has no pinned integrity, add the one of a verified "
+                  f"copy of {url} to ASSETS in bin/lib/static_assets.py")
+            failed += 1
+            continue
+
+        path = os.path.join(REPO_DIR, rel_path)
+        if os.path.exists(path) and not args.force:
+            with open(path, 'rb') as f:
+                if check_integrity(f.read(), integrity):
+                    continue
+
+        print(f"Downloading {url} to {rel_path}")
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                content = response.read()
+        except OSError as e:
+            print(f"Error: Failed to download {url}: {e}")
+            failed += 1
+            continue
+
+        if not check_integrity(content, integrity):
+            algorithm = integrity.split('-', 1)[0]
+            print(f"Error: {url} has integrity {get_integrity(content, algorithm)}, "
+                  f"expected {integrity}")
+            failed += 1
+            continue
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()